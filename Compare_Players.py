@@ -7,18 +7,20 @@ Similar NBA Players App: Compare Players Page
 @author: Josh Phelan
 """
 
-import pandas as pd
-import numpy as np
 from random import sample
-import pickle
-import urllib.request
+from dataset import for_display
+import data_access
 from st_aggrid import AgGrid, JsCode
 from st_aggrid.grid_options_builder import GridOptionsBuilder
 import altair as alt
-import PIL
-import requests
-from io import BytesIO
+from headshots import page_deadline
+from search import player_select
+from weighted import similarity_controls
 import streamlit as st
+import perf
+
+# time the stages of each rerun when NBA_PERF is set or the page is opened with ?perf=1
+perf.start_page('Compare Players')
 
 st.title('NBA Player Similarity')
 with st.sidebar:
@@ -31,7 +33,7 @@ with st.sidebar:
         st.write("")
         
     st.markdown(" ## NBA Player Similarity App")
-    st.markdown("This app calculates the similarity score between NBA players from the 1980 to 2016 seasons at 4 year intervals, and the 2021-2022 season. Similarity is calculated based on Euclidean distance from standardized per game and advanced statistics. Data provided by [Basketball Reference](https://www.basketball-reference.com/).")
+    st.markdown("This app calculates the similarity score between NBA players from the 1980 to 2016 seasons at 4 year intervals, and the 2021-2022 season. " + data_access.similarity_method() + " Data provided by [Basketball Reference](https://www.basketball-reference.com/).")
     st.sidebar.info("See the code on my [Github](https://github.com/joshphelan/nba-player-similarity).", icon="🔗")
     st.markdown('*Developed by Josh Phelan*')
 
@@ -42,23 +44,9 @@ st.write('''This page calculates the similarity score between two selected playe
          for that player that you would like to compare to any other player
          over time. Choose random players for inspiration!''')
 
-# function to return stats data for given year                  
-@st.cache
-def get_stats_data():
-    stats = pd.read_csv('data/NBA All Years Combined Stats.csv',index_col=('ID'))
-    return stats
-
-# function to retrieve distance dictionary for given year
-@st.cache(allow_output_mutation=True)
-def get_dist_data():
-    # load pickle file from url since I uploaded it to Github using Git Large File Storage
-    dist_dict = pickle.load(urllib.request.urlopen("https://github.com/joshphelan/nba-player-similarity/blob/main/data/dist_dict_all.pkl?raw=true"))
-    return dist_dict
-
 # function that returns player id given player name
 def get_id(player_name):
-    name = player_name
-    player_id = stats[stats['Player'] == name].index[0]
+    player_id = name_index.id(player_name)
     return player_id
 
 # function to show header for specific player
@@ -69,28 +57,23 @@ def name(player_name):
 def score_display(score):
     return "Similarity Score: " + '{:.2%}'.format(score)
 
-# function to calculate the max distance in the distance dictionary
+# function to return the max distance between any two players
 def get_max_d():
-    max_list = []
-    for key in dist_dict:
-        max_list.append(max(dist_dict[key]['Distance']))
-    max_d = max(max_list)
+    max_d = dist_stats.max_distance
     return max_d
     
 # returns similarity score between two players
+@perf.timed
 def get_similarity(player_1,player_2):
-    d = dist_dict[player_1]['Distance'].loc[player_2]
-    d_norm = d/max_d
-    s = 1 - d_norm
+    if space is not None:
+        return space.similarity(space.distance(player_1, player_2))
+    s = float(data_access.similarity('All Years', player_1, [player_2])[0])
     return s
 
 # retrieves average similarity score from all players compared
 def get_avg_s():
     def get_avg_d():
-        avg_list = []
-        for key in dist_dict:
-            avg_list.append(dist_dict[key]['Distance'])
-        avg_d = np.mean(avg_list)
+        avg_d = dist_stats.mean_distance
         return avg_d
     avg_d = get_avg_d()
     avg_norm = avg_d/max_d
@@ -98,14 +81,20 @@ def get_avg_s():
     return avg_s
     
     
-stats = get_stats_data()
-dist_dict = get_dist_data()
+# stats and artifacts shared by every session and page, loaded once per server process
+stats = data_access.stats('All Years')
+name_index = data_access.name_index('All Years')
+dist_stats = data_access.distance_stats('All Years')
+headshots = data_access.headshots()
 max_d = get_max_d()
 avg_s = get_avg_s()
 
 # select boxes to choose the two players to compare
-player1 = st.selectbox("Choose player 1:", list(stats['Player']),key="player1_box")
-player2 = st.selectbox("Choose player 2:", (list(stats['Player'])[::-1]),key="player2_box")
+player1 = player_select("Choose player 1:", name_index, "player1_box", search_label="Search player 1:")
+# start player 2 on a different player than player 1
+if "player2_box" not in st.session_state:
+    st.session_state['player2_box'] = name_index.names[1]
+player2 = player_select("Choose player 2:", name_index, "player2_box", search_label="Search player 2:")
     
 # initializing player1 and player 2 session state, if none
 if "rand_player1" not in st.session_state or "rand_player2" not in st.session_state:
@@ -118,16 +107,32 @@ def update_player():
     st.session_state['rand_player1'] = player1
     st.session_state['rand_player2'] = player2
 
+    # search for the random players so they are among the select box options
+    st.session_state['player1_box_query'] = player1
+    st.session_state['player2_box_query'] = player2
+    st.session_state['player1_box_page'] = 1
+    st.session_state['player2_box_page'] = 1
     st.session_state['player1_box'] = player1
     st.session_state['player2_box'] = player2
 
 # randomly samples 2 players from the stats data
 def get_random():
-    return [i for i in sample(list(stats['Player']),2)]
+    return [i for i in sample(name_index.names,2)]
 
 # button to choose random players
 st.button("Choose Random Players", on_click = update_player)
 
+# optional subset of the stats and weights to compute the similarity on instead of all stats
+weights = similarity_controls(data_access.feature_names('All Years'))
+space = data_access.weighted_space('All Years', weights) if weights else None
+if space is not None:
+    avg_s = 1 - space.mean_distance/space.max_distance
+
+# stop here until both searches match a player
+if player1 is None or player2 is None:
+    perf.finish_page()
+    st.stop()
+
 
 if player1 != player2:
     player1_id = get_id(player1)
@@ -137,6 +142,13 @@ if player1 != player2:
     st.subheader("Similarity Score")
     # delta shows difference between similarity score and average score amongst all players
     st.metric("Similarity Score", '{:.2%}'.format(s), delta='{:.2%}'.format(s-avg_s),label_visibility="collapsed")
+    # rank of player 2 among everyone compared to player 1, from the stored distance percentiles
+    # or, for a custom similarity, from player 1's distances to everyone
+    if space is None:
+        top = dist_stats.percentile(player1_id, (1 - s)*max_d)
+    else:
+        top = space.percentile(player1_id, (1 - s)*space.max_distance)
+    st.caption(player2 + " is in the top " + '{:.1%}'.format(max(top, 0.001)) + " of most similar players to " + player1)
     
     # list of stats to potentially display from multiselect box
     no_player = [col for col in stats.columns if col != 'Player']
@@ -144,7 +156,7 @@ if player1 != player2:
     
     # create dataframe for player1
     st.subheader(name(player1))
-    stats_player1 = stats.loc[[player1_id]]
+    stats_player1 = for_display(stats.loc[[player1_id]])
         
     # Display similar players with pictures in AgGrid
 #    render_image = JsCode('''
@@ -185,23 +197,12 @@ if player1 != player2:
     ''')
 
     
-    # function to return contents from url
-    def read_file_from_url(url):
-        return requests.get(url).content
+    # all headshots on the page share one deadline so a slow site cannot stall the rerun
+    deadline = page_deadline()
     
     # create list of the headshot for inputted player from basketball reference
-    pics = []
-    for idx in stats_player1.index:
-        idx = idx[:-4]
-        try:
-            file_bytes = read_file_from_url(
-                "https://www.basketball-reference.com/images/players/"+idx+".jpg"
-                )
-            image = PIL.Image.open(BytesIO(file_bytes))    
-            
-            pics.append("https://www.basketball-reference.com/images/players/"+idx+".jpg")
-        except PIL.UnidentifiedImageError:
-            pics.append("https://upload.wikimedia.org/wikipedia/en/thumb/0/03/National_Basketball_Association_logo.svg/105px-National_Basketball_Association_logo.svg.png")
+    with perf.stage('headshots'):
+        pics = headshots.resolve([idx[:-4] for idx in stats_player1.index], deadline)
     
     # insert headshot to stats_player dataframe
     stats_player1.insert(0,"Pic",pics)
@@ -215,75 +216,39 @@ if player1 != player2:
     grid_options = options_builder.build()
     
     # display AgGrid table for player 1
-    AgGrid(stats_player1[list("Pic".split(" "))+list("Player".split(" "))+all_stats], 
-            gridOptions = grid_options,
-            allow_unsafe_jscode=True,
-            enable_enterprise_modules=False,
-            #height=125, # set height to 0 in order to display tables. 9/28/23
-            theme='material')
+    with perf.stage('tables'):
+        AgGrid(stats_player1[list("Pic".split(" "))+list("Player".split(" "))+all_stats], 
+                gridOptions = grid_options,
+                allow_unsafe_jscode=True,
+                enable_enterprise_modules=False,
+                #height=125, # set height to 0 in order to display tables. 9/28/23
+                theme='material')
     
     # create dataframe for player1
     st.subheader(name(player2))
-    stats_player2 = stats.loc[[player2_id]]
+    stats_player2 = for_display(stats.loc[[player2_id]])
 
         
     # create list of the headshots for most similar players from basketball reference
-    pics = []
-    for idx in stats_player2.index:
-        idx = idx[:-4]
-        try:
-            file_bytes = read_file_from_url(
-                "https://www.basketball-reference.com/images/players/"+idx+".jpg"
-                )
-            image = PIL.Image.open(BytesIO(file_bytes))    
-            
-            pics.append("https://www.basketball-reference.com/images/players/"+idx+".jpg")
-        except PIL.UnidentifiedImageError:
-            pics.append("https://upload.wikimedia.org/wikipedia/en/thumb/0/03/National_Basketball_Association_logo.svg/105px-National_Basketball_Association_logo.svg.png")
+    with perf.stage('headshots'):
+        pics = headshots.resolve([idx[:-4] for idx in stats_player2.index], deadline)
     
     # insert headshots to players dataframe
     stats_player2.insert(0,"Pic",pics)
     
     # display AgGrid table for player 2
-    AgGrid(stats_player2[list("Pic".split(" "))+list("Player".split(" "))+all_stats], 
-            gridOptions = grid_options,
-            allow_unsafe_jscode=True,
-            enable_enterprise_modules=False,
-            #height=125, # set height to 0 in order to display tables. 9/28/23
-            theme='material')
+    with perf.stage('tables'):
+        AgGrid(stats_player2[list("Pic".split(" "))+list("Player".split(" "))+all_stats], 
+                gridOptions = grid_options,
+                allow_unsafe_jscode=True,
+                enable_enterprise_modules=False,
+                #height=125, # set height to 0 in order to display tables. 9/28/23
+                theme='material')
 
     
-    # function to return comparison table between two players
-    @st.cache
-    def get_comp_table():
-        comp = pd.concat([stats.loc[player1_id],stats.loc[player2_id]],axis=1).transpose()
-        return comp
-    
-    
-    comp = get_comp_table()
-    comp_percent = pd.DataFrame()
-    comp_percent.index=comp.index
-    comp_percent['Player'] = comp['Player']
-    
-    # list of percent of total stats between the 2 players
-    for i in all_stats:
-        if i not in ['Tm','Pos']:
-            percent_list = []
-            for row in comp.index:
-                percent_list.append(comp[i][row]/sum(comp[i]))
-            col_name = i
-            comp_percent[col_name] = percent_list
-    
-    # melting comp_percent and comp dataframes so each stat name and stat value are row items
-    comp_percent = comp_percent.reset_index()
-    comp_percent = comp_percent.melt(id_vars=['index','Player'],var_name='Stat',value_name='Value').set_index('index')    
-    comp = comp.reset_index()
-    comp = comp.drop(['Pos','Tm'],axis=1)
-    comp = comp.melt(id_vars=['index','Player'],var_name='Stat',value_name='Actual').set_index('index')
-    comp_percent.rename(columns = {'0':'Value'},inplace=True)
-    
-    # merging comp_percent and comp on comp_percent so the actual stat values are included in comp_percent
-    comp_percent = comp_percent.merge(comp,how='left')
+    # share of the two players' total and actual value of each selected stat
+    with perf.stage('comparison data'):
+        comp_percent = data_access.comparison('All Years', [player1_id, player2_id], all_stats)
     
     # horizontal stacked bar chart to show relative proportion of selected stats between selected players
     bar = alt.Chart(comp_percent).mark_bar().encode(
@@ -308,7 +273,11 @@ if player1 != player2:
         )
     
     fig = (bar + rule)
-    st.altair_chart(fig, use_container_width=True)
+    with perf.stage('altair chart'):
+        st.altair_chart(fig, use_container_width=True)
     
 else:
-    st.error("Please select 2 different players.")
\ No newline at end of file
+    st.error("Please select 2 different players.")
+
+# show the timings of this rerun when enabled
+perf.finish_page()
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:02:47 2026
+
+Distance Artifact Storage
+
+@author: Josh Phelan
+"""
+
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from loader import ARTIFACT_DIR, resolve, default_remote
+from distance import dequantize
+from metrics import get_metric
+
+# function to return the artifact folder name for a year, 'All Years' is stored as 'all'
+def artifact_name(year):
+    return 'all' if year == 'All Years' else f'{year}'
+
+# function to return the path of a file inside the artifact folder for a year
+def artifact_path(year, filename, artifact_dir=ARTIFACT_DIR):
+    return os.path.join(artifact_dir, artifact_name(year), filename)
+
+# function to return the verified local path of an artifact, fetching it from the remote if missing
+def fetch_path(year, filename, artifact_dir=ARTIFACT_DIR):
+    return resolve(artifact_name(year) + '/' + filename, artifact_dir, default_remote())
+
+# saves the distance matrix as a contiguous .npy file with the player id order beside it
+def save_distances(year, ids, distances, artifact_dir=ARTIFACT_DIR):
+    os.makedirs(os.path.join(artifact_dir, artifact_name(year)), exist_ok=True)
+    np.save(artifact_path(year, 'distances.npy', artifact_dir),
+            np.ascontiguousarray(distances))
+    pd.Series(ids, name='ID').to_csv(artifact_path(year, 'ids.csv', artifact_dir),
+                                     index=False)
+
+# creates an empty distance matrix .npy file memory mapped for writing in tiles,
+# in the same format as save_distances
+def open_distances(year, ids, dtype=np.float64, artifact_dir=ARTIFACT_DIR):
+    os.makedirs(os.path.join(artifact_dir, artifact_name(year)), exist_ok=True)
+    pd.Series(ids, name='ID').to_csv(artifact_path(year, 'ids.csv', artifact_dir),
+                                     index=False)
+    return np.lib.format.open_memmap(artifact_path(year, 'distances.npy', artifact_dir),
+                                     mode='w+', dtype=dtype, shape=(len(ids), len(ids)))
+
+# saves the scale of a distance matrix stored quantized, each stored value times the scale
+# is the distance, with the largest error of the stored distances
+def save_quantization(year, scale, max_error, artifact_dir=ARTIFACT_DIR):
+    update_meta(year, artifact_dir, distance_scale=scale, quantization_error=max_error)
+
+# reads the player id order shared by every artifact of a year
+def load_ids(year, artifact_dir=ARTIFACT_DIR):
+    return pd.Index(pd.read_csv(fetch_path(year, 'ids.csv', artifact_dir))['ID'])
+
+# saves the standardized feature matrix that the distances are computed from
+def save_features(year, ids, features, artifact_dir=ARTIFACT_DIR):
+    os.makedirs(os.path.join(artifact_dir, artifact_name(year)), exist_ok=True)
+    np.save(artifact_path(year, 'features.npy', artifact_dir), np.ascontiguousarray(features))
+    pd.Series(ids, name='ID').to_csv(artifact_path(year, 'ids.csv', artifact_dir),
+                                     index=False)
+
+# loads the standardized feature matrix for a year with its player id order
+def load_features(year, artifact_dir=ARTIFACT_DIR):
+    ids = load_ids(year, artifact_dir)
+    features = np.load(fetch_path(year, 'features.npy', artifact_dir))
+    return ids, features
+
+# saves the mean and scale the standardized features were scaled with and the order of the
+# feature columns, so stat lines that are not in the dataset can be standardized the same way
+def save_scaler(year, columns, mean, scale, artifact_dir=ARTIFACT_DIR):
+    update_meta(year, artifact_dir, feature_columns=list(columns))
+    np.save(artifact_path(year, 'scaler.npy', artifact_dir), np.stack([mean, scale]))
+
+# loads the feature column order of a year and the mean and scale of each column
+def load_scaler(year, artifact_dir=ARTIFACT_DIR):
+    columns = load_meta(year, artifact_dir)['feature_columns']
+    mean, scale = np.load(fetch_path(year, 'scaler.npy', artifact_dir))
+    return columns, mean, scale
+
+# saves the name of the metric the distances of a year were computed with, and the
+# transform fitted to the year's features when the metric has one
+def save_metric(year, metric, fitted=None, artifact_dir=ARTIFACT_DIR):
+    update_meta(year, artifact_dir, metric=metric, transform=fitted is not None)
+    if fitted is not None:
+        np.save(artifact_path(year, 'transform.npy', artifact_dir), fitted)
+
+# loads the metric of a year and its fitted transform, artifacts built before the
+# metric was stored are euclidean
+def load_metric(year, artifact_dir=ARTIFACT_DIR):
+    meta = load_meta(year, artifact_dir)
+    metric = get_metric(meta.get('metric', 'euclidean'))
+    fitted = np.load(fetch_path(year, 'transform.npy', artifact_dir)) if meta.get('transform') else None
+    return metric, fitted
+
+# saves the PCA projection of the standardized features that queries run in, with the share
+# of the variance its components explain
+def save_projection(year, projection, explained_variance, artifact_dir=ARTIFACT_DIR):
+    update_meta(year, artifact_dir, components=projection.shape[1],
+                explained_variance=explained_variance)
+    np.save(artifact_path(year, 'projection.npy', artifact_dir), projection)
+
+# loads the PCA projection of a year, None when the artifacts were built without one
+def load_projection(year, artifact_dir=ARTIFACT_DIR):
+    if not load_meta(year, artifact_dir).get('components'):
+        return None
+    return np.load(fetch_path(year, 'projection.npy', artifact_dir))
+
+# function to return the standardized features of a year in the space the artifacts were
+# built in, projected when they were built with a projection and transformed by the metric,
+# where euclidean distances are the metric's distances. Euclidean features without a
+# projection are returned as they are rather than copied
+def metric_features(year, features, artifact_dir=ARTIFACT_DIR):
+    projection = load_projection(year, artifact_dir)
+    if projection is not None:
+        features = features @ projection
+    metric, fitted = load_metric(year, artifact_dir)
+    return metric.transform(features, fitted)
+
+# loads the features of a year in the space the artifacts were built in, see metric_features
+def load_metric_features(year, artifact_dir=ARTIFACT_DIR):
+    ids, features = load_features(year, artifact_dir)
+    return ids, metric_features(year, features, artifact_dir)
+
+# function to return the scale of distances stored quantized, read from meta.json, and None
+# for distances stored as floats
+def distance_scale(year, distances, artifact_dir=ARTIFACT_DIR):
+    return load_meta(year, artifact_dir).get('distance_scale') if distances.dtype.kind == 'u' else None
+
+# function to return the distances stored values stand for, dequantized when scale is not None
+def read_distances(values, scale=None):
+    if scale is None:
+        return np.asarray(values)
+    return dequantize(values, scale)
+
+# memory maps the distance matrix so only the rows that are read get paged in
+# a quantized matrix is dequantized as it is read with the scale stored in meta.json
+def load_distances(year, artifact_dir=ARTIFACT_DIR):
+    ids = load_ids(year, artifact_dir)
+    distances = np.load(fetch_path(year, 'distances.npy', artifact_dir), mmap_mode='r')
+    return DistanceMatrix(ids, distances, distance_scale(year, distances, artifact_dir))
+
+
+class DistanceMatrix:
+    # distance matrix with rows and columns in the order of ids, scale is the distance one
+    # step of a quantized matrix stands for and None for a matrix of distances
+    def __init__(self, ids, distances, scale=None):
+        self.ids = ids
+        self.distances = distances
+        self.scale = scale
+
+    # distances of stored values, dequantized when the matrix is quantized
+    def _read(self, values):
+        return read_distances(values, self.scale)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # row/column position of a player id
+    def position(self, player_id):
+        return self.ids.get_loc(player_id)
+
+    # distance between two players
+    def distance(self, player_1, player_2):
+        return float(self._read(self.distances[self.position(player_1), self.position(player_2)]))
+
+    # distances from a player to each of the given player ids
+    def distances_to(self, player_id, other_ids):
+        row = self.distances[self.position(player_id)]
+        return self._read(row[self.ids.get_indexer(other_ids)])
+
+    # distances from a player to every other player as a series indexed by player id
+    def row(self, player_id):
+        j = self.position(player_id)
+        return pd.Series(np.delete(self._read(self.distances[j]), j), index=self.ids.delete(j),
+                         name='Distance')
+
+
+# saves the top k neighbor table, positions refer to the order in ids.csv
+def save_neighbors(year, indices, distances, artifact_dir=ARTIFACT_DIR):
+    os.makedirs(os.path.join(artifact_dir, artifact_name(year)), exist_ok=True)
+    np.save(artifact_path(year, 'neighbors_idx.npy', artifact_dir), indices)
+    np.save(artifact_path(year, 'neighbors_dist.npy', artifact_dir), distances)
+
+# memory maps the top k neighbor table for a year, quantized distances are dequantized
+# as they are read like those of the distance matrix
+def load_neighbors(year, artifact_dir=ARTIFACT_DIR):
+    ids = load_ids(year, artifact_dir)
+    indices = np.load(fetch_path(year, 'neighbors_idx.npy', artifact_dir), mmap_mode='r')
+    distances = np.load(fetch_path(year, 'neighbors_dist.npy', artifact_dir), mmap_mode='r')
+    return NeighborTable(ids, indices, distances, distance_scale(year, distances, artifact_dir))
+
+
+class NeighborTable:
+    # k nearest neighbors of every player, one row per player in the order of ids
+    # scale is the distance one step of quantized distances stands for, None for distances
+    def __init__(self, ids, indices, distances, scale=None):
+        self.ids = ids
+        self.indices = indices
+        self.distances = distances
+        self.scale = scale
+
+    # number of neighbors stored for each player
+    @property
+    def k(self):
+        return self.indices.shape[1]
+
+    # ids and distances of the n nearest players to a player, closest first
+    def nearest(self, player_id, n=5):
+        j = self.ids.get_loc(player_id)
+        return self.ids[self.indices[j, :n]], read_distances(self.distances[j, :n], self.scale)
+
+
+# adds fields to the metadata stored beside the artifacts of a year
+def update_meta(year, artifact_dir=ARTIFACT_DIR, **fields):
+    os.makedirs(os.path.join(artifact_dir, artifact_name(year)), exist_ok=True)
+    path = artifact_path(year, 'meta.json', artifact_dir)
+    meta = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            meta = json.load(f)
+    meta.update(fields)
+    with open(path, 'w') as f:
+        json.dump(meta, f, indent=1, sort_keys=True)
+
+# reads the metadata stored beside the artifacts of a year
+def load_meta(year, artifact_dir=ARTIFACT_DIR):
+    with open(fetch_path(year, 'meta.json', artifact_dir)) as f:
+        return json.load(f)
+
+# saves the global max and mean distance and the percentiles of each player's distances
+def save_stats(year, max_d, mean_d, quantiles, artifact_dir=ARTIFACT_DIR):
+    update_meta(year, artifact_dir, max_distance=max_d, mean_distance=mean_d,
+                percentiles=quantiles.shape[1])
+    np.save(artifact_path(year, 'quantiles.npy', artifact_dir), quantiles.astype(np.float32))
+
+# loads the precomputed distance statistics for a year
+def load_stats(year, artifact_dir=ARTIFACT_DIR):
+    meta = load_meta(year, artifact_dir)
+    ids = load_ids(year, artifact_dir)
+    quantiles = np.load(fetch_path(year, 'quantiles.npy', artifact_dir), mmap_mode='r')
+    return DistanceStats(ids, meta['max_distance'], meta['mean_distance'], quantiles)
+
+
+class DistanceStats:
+    # precomputed distance statistics, quantiles has one row of evenly spaced
+    # percentiles per player from the min (first column) to the max (last column)
+    def __init__(self, ids, max_distance, mean_distance, quantiles):
+        self.ids = ids
+        self.max_distance = max_distance
+        self.mean_distance = mean_distance
+        self.quantiles = quantiles
+
+    # min, median and max distance from a player to everyone else
+    def player_summary(self, player_id):
+        row = self.quantiles[self.ids.get_loc(player_id)]
+        return float(row[0]), float(row[len(row) // 2]), float(row[-1])
+
+    # fraction of a player's comparisons that are closer than the given distance,
+    # so 0.02 means the pair is in the top 2% most similar for that player
+    def percentile(self, player_id, distance):
+        row = self.quantiles[self.ids.get_loc(player_id)]
+        return float(np.interp(distance, row, np.linspace(0, 1, len(row))))
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:05:02 2026
+
+Benchmark: Most Similar Distinct Players
+
+Compares the list based dedup the Compare All Years page used against the
+vectorized distinct_top_k query. Run from the repository root with
+python -m benchmarks.distinct_players
+
+@author: Josh Phelan
+"""
+
+
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from preprocess import scale
+from neighbors import NeighborIndex, player_groups
+
+# the previous implementation, sort the full row then drop repeated players with list scans
+def similar_players_lists(row, player_id):
+    ranked = list(row.sort_values().index)
+    ranked = [key for key in ranked if key[:-4] != player_id[:-4]]
+    short_ranked = [i[:-4] for i in ranked]
+    ranked = [key for n, key in list(enumerate(ranked)) if key[:-4] not in short_ranked[:n]]
+    return ranked[:5]
+
+# function to time a function over every query, returns milliseconds per query
+def time_per_query(fn, queries):
+    start = perf_counter()
+    for q in queries:
+        fn(q)
+    return (perf_counter() - start) / len(queries) * 1000
+
+
+if __name__ == '__main__':
+    stats, scaled_data = scale('All Years')
+    ids = stats.index
+    index = NeighborIndex(ids, scaled_data, groups=player_groups(ids))
+
+    rng = np.random.default_rng(0)
+    queries = list(rng.choice(ids, size=50, replace=False))
+
+    def lists(player_id):
+        j = index.position(player_id)
+        diff = index.features - index.features[j]
+        row = pd.Series(np.sqrt(np.einsum('ij,ij->i', diff, diff)), index=ids).drop(player_id)
+        return similar_players_lists(row, player_id)
+
+    def vectorized(player_id):
+        return list(index.distinct_nearest(player_id, 5)[0])
+
+    mismatches = sum(lists(q) != vectorized(q) for q in queries)
+
+    lists_ms = time_per_query(lists, queries)
+    vectorized_ms = time_per_query(vectorized, queries)
+    print(f'{len(ids)} player seasons, {len(queries)} queries, {mismatches} mismatched results')
+    print(f'list dedup:        {lists_ms:8.2f} ms per query')
+    print(f'distinct_top_k:    {vectorized_ms:8.2f} ms per query')
+    print(f'speedup:           {lists_ms / vectorized_ms:8.1f}x')
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:45:37 2026
+
+Similarity Service Load Test
+
+Sends a mix of pairwise similarity, season and all years top-k and search
+requests to the similarity service from concurrent keep-alive connections and
+reports the p50 and p99 latency of each endpoint and the requests per second.
+Unless --url points at a running service, one is started with its process
+pinned to a single core. Run from the repository root with
+python -m benchmarks.load_test
+
+@author: Josh Phelan
+"""
+
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+import numpy as np
+from dataset import read_stats
+from pipeline import YEARS
+
+# share of the requests sent to each endpoint
+MIX = {'similarity': 0.25, 'similar season': 0.25, 'similar all years': 0.25, 'search': 0.25}
+
+# function to build n random request paths following the endpoint mix, returns
+# (endpoint, path) pairs
+def request_paths(n, seed=0):
+    rng = np.random.default_rng(seed)
+    seasons = {year: read_stats(year, columns=['Player']) for year in YEARS}
+    all_years = read_stats('All Years', columns=['Player'])
+
+    paths = []
+    for endpoint in rng.choice(list(MIX), n, p=list(MIX.values())):
+        if endpoint == 'similarity':
+            player_1, player_2 = rng.choice(all_years.index, 2, replace=False)
+            query = {'player_1': player_1, 'player_2': player_2}
+            path = '/similarity?'
+        elif endpoint == 'similar season':
+            year = rng.choice(YEARS)
+            query = {'player': rng.choice(seasons[year].index), 'year': year}
+            path = '/similar?'
+        elif endpoint == 'similar all years':
+            query = {'player': rng.choice(all_years.index)}
+            path = '/similar?'
+        else:
+            # the first few letters of a name, as typed into a search box
+            name = rng.choice(all_years['Player'])
+            query = {'q': name[:rng.integers(2, 6)]}
+            path = '/search?'
+        paths.append((endpoint, path + urlencode(query)))
+    return paths
+
+# function to return a free local port
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+# function to start the service on a free port pinned to one cpu, with numpy kept to one
+# thread, returns the process and its url once it answers
+def start_service(cpu=0, timeout=120):
+    port = free_port()
+    env = dict(os.environ, OMP_NUM_THREADS='1', OPENBLAS_NUM_THREADS='1', MKL_NUM_THREADS='1')
+    process = subprocess.Popen([sys.executable, 'service.py', '--port', f'{port}'], env=env)
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(process.pid, {cpu})
+
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('The service exited while starting')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return process, url
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError('The service did not start within ' + f'{timeout}' + ' s')
+
+# function to send requests from one connection until the deadline, the paths are taken
+# in turn starting at offset, appends (endpoint, seconds, status) to results
+def client(url, paths, offset, deadline, results):
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    i = offset
+    timings = []
+    while time.monotonic() < deadline:
+        endpoint, path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+            status = None
+        timings.append((endpoint, time.perf_counter() - start, status))
+    connection.close()
+    results.extend(timings)
+
+# function to load the service from concurrent connections for a number of seconds,
+# returns the (endpoint, seconds, status) of every request and the elapsed time
+def run_load(url, paths, duration=10.0, concurrency=8):
+    results = []
+    deadline = time.monotonic() + duration
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(url, paths, i * len(paths) // concurrency,
+                                                     deadline, results))
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+# function to summarize the latency of each endpoint and of all requests
+def summarize(results, elapsed):
+    summary = {}
+    for endpoint in list(MIX) + ['all']:
+        rows = [r for r in results if endpoint in ('all', r[0])]
+        if not rows:
+            continue
+        ms = np.array([seconds for name, seconds, status in rows]) * 1000
+        summary[endpoint] = {'requests': len(rows),
+                             'errors': sum(status != 200 for name, seconds, status in rows),
+                             'p50_ms': float(np.percentile(ms, 50)),
+                             'p99_ms': float(np.percentile(ms, 99)),
+                             'rps': len(rows) / elapsed}
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the similarity service.')
+    parser.add_argument('--url', help='running service to test, otherwise one is started on one core')
+    parser.add_argument('--cpu', type=int, default=0, help='cpu the started service is pinned to')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of load')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='concurrent connections')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds of load before measuring')
+    parser.add_argument('--paths', type=int, default=10000, help='distinct random requests')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='json file for the summary')
+    args = parser.parse_args()
+
+    paths = request_paths(args.paths, args.seed)
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_service(args.cpu)
+    try:
+        if args.warmup:
+            run_load(url, paths, args.warmup, args.concurrency)
+        results, elapsed = run_load(url, paths, args.duration, args.concurrency)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    summary = summarize(results, elapsed)
+    print(f"{'endpoint':<20} {'requests':>9} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+    for endpoint, row in summary.items():
+        print(f"{endpoint:<20} {row['requests']:>9} {row['errors']:>7} {row['p50_ms']:>9.2f} "
+              f"{row['p99_ms']:>9.2f} {row['rps']:>9.1f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'url': url, 'duration': elapsed, 'concurrency': args.concurrency,
+                       'endpoints': summary}, f, indent=1)
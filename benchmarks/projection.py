@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:51:36 2026
+
+Benchmark: PCA Projection
+
+Compares similarity queries in the PCA projected space of the standardized
+features against the full dimensional space for each explained variance
+target, reporting the components kept, the overlap of each player's top k
+with the full dimensional top k, and the memory and time of the feature
+matrix, the KD-tree and the tiled top k the pipeline builds the neighbor
+tables with. Run from the repository root with
+python -m benchmarks.projection [--year All Years] [--variance 0.9 0.95 0.99]
+
+@author: Josh Phelan
+"""
+
+
+import argparse
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from distance import tiled_top_k
+from metrics import METRICS
+from neighbors import NeighborIndex, player_groups
+from preprocess import scale, fit_projection, metric_space
+
+# function to return the mean share of each row's neighbors in a that are also in b
+def overlap(a, b):
+    return float(np.mean([len(np.intersect1d(x, y)) for x, y in zip(a, b)]) / a.shape[1])
+
+# function to call fn repeat times, returns the result and the best time in milliseconds
+def best_time(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        result = fn()
+        times.append(perf_counter() - start)
+    return result, min(times) * 1000
+
+# function to measure the queries of one space, the features in the metric's space
+# returns the row of the report and the top k and distinct top k positions
+def measure(x, k, groups, queries):
+    index, build_ms = best_time(lambda: NeighborIndex(pd.RangeIndex(len(x)), x, groups=groups))
+    (indices, _), kdtree_ms = best_time(lambda: index.top_k(k))
+    tiled_ms = best_time(lambda: tiled_top_k(x, k))[1]
+    distinct, distinct_ms = best_time(lambda: np.array([index.distinct_nearest(q, 5)[0]
+                                                        for q in queries]))
+    row = {'dims': x.shape[1], 'mb': x.nbytes / 2 ** 20, 'build_ms': build_ms,
+           'kdtree_ms': kdtree_ms, 'tiled_ms': tiled_ms,
+           'distinct_ms': distinct_ms / len(queries)}
+    return row, indices, distinct
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare PCA projected similarity with the full features.')
+    parser.add_argument('--year', default='All Years')
+    parser.add_argument('--variance', type=float, nargs='+', default=[0.8, 0.9, 0.95, 0.99])
+    parser.add_argument('--metric', default='euclidean', choices=list(METRICS))
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200, help='players the distinct top 5 is timed for')
+    args = parser.parse_args()
+
+    stats, scaled_data = scale(args.year)
+    groups = player_groups(stats.index) if args.year == 'All Years' else None
+    rng = np.random.default_rng(0)
+    queries = rng.choice(len(stats), size=min(args.queries, len(stats)), replace=False)
+
+    full, full_indices, full_distinct = measure(metric_space(scaled_data, args.metric)[0],
+                                                args.k, groups, queries)
+    full.update({'variance': 1.0, 'top5': 1.0, 'topk': 1.0, 'distinct5': 1.0})
+    rows = [('full', full)]
+    for variance in args.variance:
+        projection, explained = fit_projection(scaled_data, variance)
+        x = metric_space(scaled_data, args.metric, projection)[0]
+        row, indices, distinct = measure(x, args.k, groups, queries)
+        row.update({'variance': explained, 'top5': overlap(indices[:, :5], full_indices[:, :5]),
+                    'topk': overlap(indices, full_indices), 'distinct5': overlap(distinct, full_distinct)})
+        rows.append((f'pca {variance:g}', row))
+
+    print(f'{args.year}: {len(stats)} players, {args.metric} distance, overlap with the full '
+          f'dimensional neighbors, times are the best of 3')
+    print(f"{'space':<10} {'dims':>5} {'variance':>9} {'top 5':>7} {'top ' + f'{args.k}':>7} "
+          f"{'distinct':>9} {'MB':>7} {'build ms':>9} {'kd top k':>9} {'tiled ms':>9} {'ms/query':>9}")
+    for name, row in rows:
+        print(f"{name:<10} {row['dims']:>5} {row['variance']:>9.3f} {row['top5']:>7.3f} "
+              f"{row['topk']:>7.3f} {row['distinct5']:>9.3f} {row['mb']:>7.2f} {row['build_ms']:>9.1f} "
+              f"{row['kdtree_ms']:>9.1f} {row['tiled_ms']:>9.1f} {row['distinct_ms']:>9.3f}")
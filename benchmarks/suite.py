@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:24:31 2026
+
+Benchmark Suite
+
+Times cleaning, preprocessing, artifact loading, the page statistics, the most
+similar players queries of both pages and the comparison chart data, against
+the real data and synthetic datasets of 1k, 10k and 50k player seasons.
+Results are written to a json file, and --compare flags benchmarks that got
+slower than a previous results file. Run from the repository root with
+python -m benchmarks.suite
+
+@author: Josh Phelan
+"""
+
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from clean import clean
+from comparison import comparison_frame
+from preprocess import preprocess
+from artifacts import load_features, load_metric_features, load_distances, load_neighbors, load_stats
+from dataset import read_stats
+from neighbors import NeighborIndex, player_groups
+from loader import write_manifest
+from pipeline import YEARS, PARAMS, build_season_stats, build_artifacts, run_parallel, rebuild, targets
+from benchmarks.synthetic import SEASONS, synthetic_seasons, write_raw
+
+SIZES = [1000, 10000, 50000]
+
+# synthetic datasets are kept here between runs, keyed by size and seed
+SYNTHETIC_DIR = 'benchmarks/.synthetic'
+RESULTS_DIR = 'benchmarks/results'
+
+# largest dataset preprocess builds the full n x n matrix for, 10k players is 800 MB
+FULL_MATRIX_LIMIT = 10000
+
+# the stats the comparison chart shows by default on every page
+CHART_STATS = ['Tm', 'PTS', 'TRB', 'AST']
+
+# runs the block with the working directory set to path, the data paths are relative
+@contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+# function to time fn once per item of args, returns the run times in seconds
+def timings(fn, args):
+    times = []
+    for arg in args:
+        start = perf_counter()
+        fn(arg)
+        times.append(perf_counter() - start)
+    return times
+
+# function to build a synthetic dataset of n player seasons under SYNTHETIC_DIR, reusing
+# one built by an earlier run, returns its directory and seasons
+def synthetic_dataset(n, seed=0, workers=None, regenerate=False):
+    root = os.path.abspath(os.path.join(SYNTHETIC_DIR, f'{n}-{seed}'))
+    seasons = list(SEASONS)
+    if os.path.exists(os.path.join(root, 'complete')) and not regenerate:
+        return root, seasons
+
+    print('Building synthetic dataset of', n, 'player seasons in', root)
+    write_raw(synthetic_seasons(n, seasons, seed=seed), root)
+    with working_directory(root):
+        print_failures(run_parallel([('stats ' + season, build_season_stats, (season,), {})
+                                     for season in seasons], workers))
+        print_failures(run_parallel([('artifacts ' + year, build_artifacts, (year,),
+                                      {'full_matrix': n <= FULL_MATRIX_LIMIT, 'block_size': 1024})
+                                     for year in seasons + ['All Years']], workers))
+        write_manifest()
+    with open(os.path.join(root, 'complete'), 'w'):
+        pass
+    return root, seasons
+
+def print_failures(results):
+    failed = {name: error for name, (seconds, error) in results.items() if error}
+    for name, error in failed.items():
+        print(name, 'failed:\n' + error)
+    if failed:
+        raise RuntimeError('Could not build the benchmark dataset')
+
+# the comparison chart data of the pages for two players, see comparison.comparison_frame
+def comparison_chart_data(stats, player_1, player_2, all_stats):
+    return comparison_frame(stats, [player_1, player_2], all_stats)
+
+# function to run every benchmark on the dataset in the working directory, returns a
+# dict of benchmark name to its run times in seconds
+def run_benchmarks(seasons, n, repeats=5, queries=50, seed=0):
+    rng = np.random.default_rng(seed)
+    runs = range(repeats)
+    results = {}
+
+    # cleaning every season's raw tables
+    results['clean'] = timings(lambda run: [clean(season) for season in seasons], runs)
+
+    # standardizing all years and computing the distances
+    full_matrix = n <= FULL_MATRIX_LIMIT
+    results['preprocess'] = timings(lambda run: preprocess('All Years', full_matrix=full_matrix),
+                                    runs)
+
+    # reading the stats dataset and loading the artifacts the pages load
+    results['read_stats'] = timings(lambda run: read_stats('All Years'), runs)
+    results['load_features'] = timings(lambda run: load_features('All Years'), runs)
+    results['load_neighbors'] = timings(lambda run: load_neighbors(seasons[-1]), runs)
+    results['load_stats'] = timings(lambda run: load_stats('All Years'), runs)
+    if full_matrix:
+        results['load_distances'] = timings(lambda run: load_distances('All Years'), runs)
+
+    # max distance and average similarity shown on the Compare Players page
+    def max_d_avg_s(run):
+        dist_stats = load_stats('All Years')
+        max_d = dist_stats.max_distance
+        return max_d, 1 - dist_stats.mean_distance / max_d
+    results['get_max_d_avg_s'] = timings(max_d_avg_s, runs)
+
+    # most similar players on the Compare By Season page
+    season = seasons[-1]
+    season_stats = read_stats(season)
+    neighbors = load_neighbors(season)
+    season_queries = rng.choice(season_stats.index, queries)
+    results['similar_players_season'] = timings(
+        lambda player_id: season_stats.loc[list(neighbors.nearest(player_id, 5)[0])], season_queries)
+
+    # most similar distinct players on the Compare All Years page
+    stats = read_stats('All Years')
+    ids, features = load_metric_features('All Years')
+    index = NeighborIndex(ids, features, groups=player_groups(ids))
+    all_queries = rng.choice(stats.index, queries)
+    results['similar_players_all_years'] = timings(
+        lambda player_id: stats.loc[list(index.distinct_nearest(player_id, 5)[0])], all_queries)
+
+    # comparison chart data for random pairs of players
+    pairs = rng.choice(stats.index, (queries, 2))
+    results['comparison_chart'] = timings(
+        lambda pair: comparison_chart_data(stats, pair[0], pair[1], CHART_STATS), pairs)
+
+    return results
+
+# function to summarize run times as milliseconds
+def summarize(name, dataset, rows, times):
+    ms = np.array(times) * 1000
+    return {'benchmark': name, 'dataset': dataset, 'rows': int(rows), 'samples': len(ms),
+            'min_ms': float(ms.min()), 'median_ms': float(np.median(ms)),
+            'mean_ms': float(ms.mean()), 'max_ms': float(ms.max())}
+
+# function to describe the machine and code a run was made on
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'time': datetime.now().isoformat(timespec='seconds'), 'commit': commit,
+            'python': sys.version.split()[0], 'numpy': np.__version__,
+            'pandas': pd.__version__, 'platform': platform.platform(),
+            'processor': platform.processor(), 'cpus': os.cpu_count()}
+
+# function to compare results with a baseline results file, returns the benchmarks whose
+# median got slower by more than the threshold ratio
+def regressions(results, baseline, threshold=1.2):
+    before = {(r['benchmark'], r['dataset']): r for r in baseline['results']}
+    slower = []
+    for r in results:
+        old = before.get((r['benchmark'], r['dataset']))
+        if old is None:
+            continue
+        ratio = r['median_ms'] / old['median_ms']
+        print(f"{r['dataset']:<16} {r['benchmark']:<28} {old['median_ms']:10.2f} -> "
+              f"{r['median_ms']:10.2f} ms  {ratio:5.2f}x" + ('  REGRESSION' if ratio > threshold else ''))
+        if ratio > threshold:
+            slower.append(r)
+    return slower
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the benchmark suite.')
+    parser.add_argument('--sizes', type=int, nargs='*', default=SIZES,
+                        help='synthetic dataset sizes in player seasons')
+    parser.add_argument('--no-real', action='store_true', help='skip the real data')
+    parser.add_argument('--repeats', type=int, default=5, help='runs of each whole dataset benchmark')
+    parser.add_argument('--queries', type=int, default=50, help='random players per query benchmark')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='worker processes building synthetic datasets')
+    parser.add_argument('--regenerate', action='store_true', help='rebuild the synthetic datasets')
+    parser.add_argument('--output', help='results file, defaults to benchmarks/results/<time>.json')
+    parser.add_argument('--compare', help='earlier results file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='slowdown ratio of the median reported as a regression')
+    args = parser.parse_args()
+
+    datasets = []
+    if not args.no_real:
+        # bring the real artifacts up to date with the distance matrices the benchmarks
+        # load, only stale ones are rebuilt
+        rebuild(targets(params=dict(PARAMS, full_matrix=True)), workers=args.workers)
+        datasets.append(('real', os.getcwd(), YEARS))
+    for n in args.sizes:
+        root, seasons = synthetic_dataset(n, args.seed, args.workers, args.regenerate)
+        datasets.append((f'synthetic-{n}', root, seasons))
+
+    results = []
+    for dataset, root, seasons in datasets:
+        with working_directory(root):
+            rows = len(read_stats('All Years', columns=['Player']))
+            print('Running benchmarks on', dataset, 'with', rows, 'player seasons')
+            for name, times in run_benchmarks(seasons, rows, args.repeats, args.queries,
+                                              args.seed).items():
+                results.append(summarize(name, dataset, rows, times))
+                print(f'  {name:<28} {results[-1]["median_ms"]:10.2f} ms median')
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=1)
+    print('Wrote', output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            slower = regressions(results, json.load(f), args.threshold)
+        if slower:
+            print(len(slower), 'benchmarks regressed')
+            raise SystemExit(1)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:21:46 2026
+
+Synthetic Player Seasons
+
+Generates raw Per Game and Advanced tables of any size with the same schema as
+the basketball reference tables, so the pipeline builds a 49 column combined
+stats dataset from them just like the real one. Rows are real player seasons
+resampled under new player ids with noise added to every stat.
+
+@author: Josh Phelan
+"""
+
+
+import os
+import numpy as np
+import pandas as pd
+
+# real season the synthetic rows are resampled from
+SOURCE_YEAR = '2022'
+
+# synthetic seasons, as many as the real data has
+SEASONS = [f'{year}' for year in range(2000, 2011)]
+
+# columns copied from the source rows as is, identifiers and the columns clean filters on
+FIXED = ['Rk', 'Player', 'Pos', 'Age', 'Tm', 'G', 'GS', 'Player-additional']
+
+# function to read a real season's raw tables, one row per player who passes the games filter
+def source_tables(year=SOURCE_YEAR):
+    per_game = pd.read_csv('raw_data/NBA ' + year + ' Per Game.csv')
+    advanced = pd.read_csv('raw_data/NBA ' + year + ' Advanced.csv')
+    per_game = per_game.drop_duplicates('Player-additional')
+    advanced = advanced.drop_duplicates('Player-additional')
+
+    per_game = per_game[per_game['G'] > 30]
+    columns = advanced.columns
+    advanced = advanced.set_index('Player-additional').loc[per_game['Player-additional']]
+    return per_game.reset_index(drop=True), advanced.reset_index()[columns]
+
+# function to add noise to the stats of resampled rows, keeping stats that are never
+# negative at or above 0 and percentages at or below 1
+def _jitter(table, rng, scale=0.25):
+    table = table.copy()
+    for col in table.columns:
+        if col in FIXED or not pd.api.types.is_float_dtype(table[col]) or table[col].isna().all():
+            continue
+        values = table[col].to_numpy()
+        noisy = values + rng.normal(0, scale * np.nanstd(values), len(values))
+        low, high = np.nanmin(values), np.nanmax(values)
+        if low >= 0:
+            noisy = np.maximum(noisy, 0)
+        if '%' in col and high <= 1:
+            noisy = np.minimum(noisy, 1)
+        # the source tables round every stat to 1 or 3 decimals
+        table[col] = np.round(noisy, 3)
+    return table
+
+# function to generate n player seasons spread evenly over the given seasons
+# each player appears in about seasons_per_player seasons, so the all years queries
+# that keep one season per player see repeated players like in the real data
+# returns a dict of season to its (per_game, advanced) raw tables
+def synthetic_seasons(n, seasons=SEASONS, seasons_per_player=4, seed=0):
+    rng = np.random.default_rng(seed)
+    per_game, advanced = source_tables()
+
+    players = max(n // seasons_per_player, -(-n // len(seasons)))
+    # every player keeps the profile of one source row across seasons
+    profile = rng.integers(0, len(per_game), players)
+
+    tables = {}
+    for i, season in enumerate(seasons):
+        size = n // len(seasons) + (i < n % len(seasons))
+        chosen = np.sort(rng.choice(players, size, replace=False))
+
+        season_per_game = _jitter(per_game.iloc[profile[chosen]].reset_index(drop=True), rng)
+        season_advanced = _jitter(advanced.iloc[profile[chosen]].reset_index(drop=True), rng)
+        for table in (season_per_game, season_advanced):
+            table['Rk'] = np.arange(1, size + 1)
+            table['Player'] = [f'Synthetic Player {p}' for p in chosen]
+            table['Player-additional'] = [f'syn{p:06d}' for p in chosen]
+        tables[season] = season_per_game, season_advanced
+    return tables
+
+# writes generated tables to raw_data under root with the basketball reference file names
+def write_raw(tables, root='.'):
+    os.makedirs(os.path.join(root, 'raw_data'), exist_ok=True)
+    for season, (per_game, advanced) in tables.items():
+        per_game.to_csv(os.path.join(root, 'raw_data', 'NBA ' + season + ' Per Game.csv'),
+                        index=False)
+        # the advanced table has two unnamed spacer columns, written back with empty headers
+        advanced = advanced.rename(columns=lambda col: '' if col.startswith('Unnamed') else col)
+        advanced.to_csv(os.path.join(root, 'raw_data', 'NBA ' + season + ' Advanced.csv'),
+                        index=False)
@@ -57,7 +57,7 @@ def clean(year):
     stats = pd.merge(per_game, advanced, how = "inner", on= "ID")
     
     # Clean player name so there are no asterisks
-    stats['Player'] = stats['Player'].str.replace('*','', regex=True)
+    stats['Player'] = stats['Player'].str.replace('*','', regex=False)
     
     # Drop Games Started because of incomplete data for 1980
     stats.drop('GS',axis=1,inplace=True)
@@ -7,39 +7,43 @@ Combine All Years Data
 @author: Josh Phelan
 """
 
-import pandas as pd
-import numpy as np
-from preprocess import preprocess
-import pickle
-
-start = 1980
-end = 2017
-interval = 4
-
-years = list(np.arange(start, end, interval))
-years.append(2022)
-
-all_stats = pd.DataFrame()
-
-for year in years:
-    year = f'{year}'
-    
-    stats = pd.read_csv('data/NBA ' + year +' Combined Stats.csv',index_col=('ID'))
-    stats.index = stats.index + year
-    stats['Player'] = stats['Player'] + ' ('+ year+')'
-    
-    all_stats = pd.concat([all_stats,stats], axis = 0)
-    
-# Confirm no duplicates
-all_stats.index.duplicated().any()
-
-# Save final dataframe of combined stats
-all_stats.to_csv('data/NBA All Years Combined Stats.csv')
-
-
-# Dictionary of all years
-dist_dict_all = preprocess('All Years')
-
-# Save distance dictionary as pickle file
-with open('data/dist_dict_all.pkl', 'wb') as f:
-    pickle.dump(dist_dict_all, f)
+from pipeline import YEARS, export_all_years_csv, build_artifacts
+from loader import write_manifest
+
+# precision of the distance matrix, 'float32' halves memory at ~1e-6 error, 'uint16' and
+# 'uint8' store it quantized in a quarter and an eighth of the memory, see pipeline.build_artifacts
+dtype = 'float64'
+
+# number of nearest neighbors stored for each player
+k = 50
+
+# the n x n matrix is impractical for the full history and only the benchmarks read it,
+# the KD-tree query engine answers from the features and neighbor table, set to True to
+# also build it
+full_matrix = False
+
+# distance the players are compared with, 'euclidean', 'cosine' or 'mahalanobis'
+metric = 'euclidean'
+
+# share of the variance the PCA projection of the features keeps, e.g. 0.95, None keeps
+# every standardized stat
+variance = None
+
+# rows and columns per tile of distances, the build holds one tile in memory at a time
+# and writes the matrix to a memory mapped file, None builds the whole matrix in memory
+block_size = 1024
+
+# the stats of all years are read from the season partitions of the stats dataset,
+# set to True to also export them as one csv
+csv = False
+
+# Export the combined stats of all years
+if csv:
+    export_all_years_csv(YEARS)
+
+# Save features, top k neighbors and distance statistics of all years
+build_artifacts('All Years', dtype=dtype, k=k, full_matrix=full_matrix, block_size=block_size,
+                metric=metric, variance=variance)
+
+# Record the hash of every artifact so the app can verify what it loads
+write_manifest()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:53:14 2026
+
+Player Comparison Chart Data
+
+The data of the player comparison chart every page draws, each player's share
+of the players' total and actual value of each chosen stat, in the long format
+Altair charts. All players and stats are computed in one pass over a float
+matrix rather than stat by stat.
+
+@author: Josh Phelan
+"""
+
+
+import numpy as np
+import pandas as pd
+from preprocess import feature_columns
+
+# function to return the comparison chart data of players, one row per stat and player with
+# the player's name, the stat, the player's share of the players' total of the stat as Value
+# and the stat as shown in the tables as Actual, stats in the order chosen and players in
+# the order given. Team, position and other labels are left out, a stat every player has 0
+# of has no share and its Value is NaN
+def comparison_frame(stats, player_ids, chart_stats):
+    columns = feature_columns(dict.fromkeys(chart_stats))
+    players = stats.loc[list(player_ids)]
+
+    # rounded like dataset.for_display so the tooltips match the tables
+    actual = players[columns].to_numpy(np.float64).round(3)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share = actual / actual.sum(axis=0)
+
+    n, m = actual.shape
+    return pd.DataFrame({'Player': np.tile(players['Player'].to_numpy(object), m),
+                         'Stat': np.repeat(np.array(columns, dtype=object), n),
+                         'Value': share.T.ravel(),
+                         'Actual': actual.T.ravel()})
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:42:09 2026
+
+Shared Data Access
+
+The stats, artifacts and indexes the pages read, loaded once per server process
+with st.cache_resource and shared by every session and page without copies.
+Each getter checks the stamps of the files it was loaded from, and a resource
+whose files changed on disk, e.g. after the pipeline rebuilt them, is dropped
+and loaded again. The resources are shared, so callers must not modify them.
+The data of single seasons is kept in a residency with an entry and memory
+budget instead, so clicking through every season does not keep them all.
+The artifacts are not committed, when there are none and no remote to fetch
+them from, e.g. on a fresh clone or deploy, the first load builds them.
+
+@author: Josh Phelan
+"""
+
+
+import glob
+import os
+import threading
+import numpy as np
+import streamlit as st
+import perf
+import pipeline
+from artifacts import (artifact_path, load_features, load_meta, load_metric, metric_features, load_neighbors,
+                       load_stats)
+from comparison import comparison_frame
+from dataset import STATS_DIR, season_path, read_stats
+from headshots import HeadshotResolver
+from loader import ARTIFACT_DIR, ARTIFACT_URL, MANIFEST
+from metrics import get_metric
+from neighbors import NeighborIndex, player_groups
+from preprocess import feature_columns
+from residency import Residency
+from search import NameIndex
+from stat_lines import StatLineQuery
+from weighted import SPACES, WeightedSpace, weight_key
+
+# budget of the seasons resident at once, the least recently used seasons are evicted beyond
+# NBA_SEASON_CACHE_ENTRIES seasons or NBA_SEASON_CACHE_MB megabytes
+SEASON_ENTRIES = int(os.environ.get('NBA_SEASON_CACHE_ENTRIES', '4'))
+SEASON_BYTES = int(float(os.environ.get('NBA_SEASON_CACHE_MB', '128')) * 2 ** 20)
+
+# stamps of the files each resource was last loaded from, by getter and year
+_loaded = {}
+_lock = threading.Lock()
+_build_lock = threading.Lock()
+
+# builds the stats and artifacts with the pipeline when the artifact directory has no
+# manifest and there is no NBA_ARTIFACT_URL to fetch them from, once per server process
+# every other session waits for the build, which runs in this process rather than on a
+# pool so the server is not forked
+def ensure_artifacts():
+    if ARTIFACT_URL or os.path.exists(os.path.join(ARTIFACT_DIR, MANIFEST)):
+        return
+    with _build_lock:
+        if os.path.exists(os.path.join(ARTIFACT_DIR, MANIFEST)):
+            return
+        with st.spinner('Building the similarity data, this only runs on the first start...'):
+            results, skipped, blocked = pipeline.rebuild(workers=1)
+        failures = [name for name, (seconds, error) in results.items() if error] + blocked
+        if failures:
+            pipeline.print_report(results)
+            raise RuntimeError('Could not build ' + ', '.join(failures)
+                               + ', run python pipeline.py to see the errors')
+
+# function to return the stats files of a season or of every season for 'All Years'
+def stats_files(year):
+    if year == 'All Years':
+        return sorted(glob.glob(os.path.join(STATS_DIR, 'season=*', 'stats.parquet')))
+    return [season_path(year)]
+
+# function to return the artifact files of a year a resource is loaded from,
+# ids.csv is rewritten with every build so it is always included
+def artifact_files(year, *filenames):
+    return [artifact_path(year, filename) for filename in ('ids.csv',) + filenames]
+
+# function to return every file the data of a season is loaded from
+def season_files(year):
+    return stats_files(year) + artifact_files(year, 'features.npy', 'meta.json', 'transform.npy',
+                                              'projection.npy', 'scaler.npy', 'neighbors_idx.npy',
+                                              'neighbors_dist.npy', 'quantiles.npy')
+
+# function to return the modification time and size of each file, None for missing files
+def stamps(paths):
+    result = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            result.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            result.append((path, None, None))
+    return tuple(result)
+
+# function to return the stamps of the files a resource is loaded from, first dropping the
+# getter's cached resources if any of those files changed since it was last loaded
+def _version(loader, year, paths):
+    ensure_artifacts()
+    version = stamps(paths)
+    with _lock:
+        previous = _loaded.get((loader.__name__, year))
+        _loaded[(loader.__name__, year)] = version
+    if previous is not None and previous != version:
+        loader.clear()
+    return version
+
+# drops every shared resource so the next rerun loads them again
+def clear():
+    with _lock:
+        _loaded.clear()
+    st.cache_resource.clear()
+    SPACES.clear()
+    SEASONS.clear()
+
+
+class SeasonData:
+    # the stats and artifacts of a season the pages read, loaded together so a season is
+    # resident or evicted as a whole
+    def __init__(self, year):
+        self.stats = read_stats(year)
+        self.name_index = NameIndex(self.stats)
+        self.features = load_features(year)
+        self.features[1].flags.writeable = False
+        self.metric = load_metric(year)
+        # distances in the space of the metric the year was built with, from the features
+        # already loaded, euclidean features without a projection are shared, not copied
+        x = metric_features(year, self.features[1])
+        x.flags.writeable = False
+        self.index = NeighborIndex(self.features[0], x)
+        self.neighbors = load_neighbors(year)
+        self.distance_stats = load_stats(year)
+        self.stat_lines = StatLineQuery(year, self.index, self.distance_stats.max_distance,
+                                        lambda weights: weighted_space(year, weights))
+
+    # approximate bytes held by the season, what the residency budget counts
+    # the memory mapped neighbor table and quantiles count once they are paged in
+    # the index features count only when they are not the standardized features themselves
+    @property
+    def nbytes(self):
+        tree = sum(array.nbytes for array in self.index.tree.get_arrays())
+        features = self.features[1].nbytes
+        if not np.shares_memory(self.index.features, self.features[1]):
+            features += self.index.features.nbytes
+        return (int(self.stats.memory_usage(deep=True).sum()) + self.name_index.nbytes
+                + features + tree
+                + self.neighbors.indices.nbytes + self.neighbors.distances.nbytes
+                + self.distance_stats.quantiles.nbytes)
+
+# function to load the data of a season for the residency, keys are (year, file stamps)
+def _season(key):
+    perf.miss()
+    return SeasonData(key[0])
+
+# seasons shared by every session, a rebuilt season gets new stamps and so a new key
+SEASONS = Residency(_season, SEASON_ENTRIES, SEASON_BYTES)
+
+# function to return the data of a season, loading it when it is not resident
+def season(year):
+    ensure_artifacts()
+    return SEASONS.get((year, stamps(season_files(year))))
+
+# function to load the data of seasons in the background, e.g. the seasons next to the one
+# a user picked, so picking them next finds them resident
+def prefetch(years):
+    ensure_artifacts()
+    SEASONS.prefetch([(year, stamps(season_files(year))) for year in years])
+
+# function to return the resident seasons and their bytes, and the hits, misses, waits for a
+# load already running, evictions and prefetches of the season residency
+def season_residency():
+    return SEASONS.info()
+
+
+@st.cache_resource(show_spinner=False)
+def _stats(year, version):
+    perf.miss()
+    return read_stats(year)
+
+@st.cache_resource(show_spinner=False)
+def _name_index(year, version):
+    perf.miss()
+    return NameIndex(stats(year))
+
+@st.cache_resource(show_spinner=False)
+def _features(year, version):
+    perf.miss()
+    ids, features = load_features(year)
+    features.flags.writeable = False
+    return ids, features
+
+@st.cache_resource(show_spinner=False)
+def _metric(year, version):
+    perf.miss()
+    return load_metric(year)
+
+@st.cache_resource(show_spinner=False)
+def _index(year, version):
+    perf.miss()
+    # distances in the space of the metric the year was built with, from the shared
+    # standardized features, euclidean features without a projection are not copied
+    ids, scaled = features(year)
+    x = metric_features(year, scaled)
+    x.flags.writeable = False
+    # group each player's seasons so all years queries can return distinct players
+    groups = player_groups(ids) if year == 'All Years' else None
+    return NeighborIndex(ids, x, groups=groups)
+
+@st.cache_resource(show_spinner=False)
+def _neighbors(year, version):
+    perf.miss()
+    return load_neighbors(year)
+
+@st.cache_resource(show_spinner=False)
+def _distance_stats(year, version):
+    perf.miss()
+    return load_stats(year)
+
+@st.cache_resource(show_spinner=False)
+def _stat_lines(year, version):
+    perf.miss()
+    return StatLineQuery(year, index(year), max_distance(year),
+                         lambda weights: weighted_space(year, weights))
+
+# the most recent comparisons, one for each pair of players and chosen stats
+@st.cache_resource(show_spinner=False, max_entries=256)
+def _comparison(year, version, player_ids, chart_stats):
+    perf.miss()
+    return comparison_frame(stats(year), player_ids, chart_stats)
+
+@st.cache_resource(show_spinner=False)
+def _similarity_method(year, version):
+    perf.miss()
+    meta = load_meta(year)
+    text = ('Similarity is calculated based on ' + get_metric(meta.get('metric', 'euclidean')).label
+            + ' from standardized per game and advanced statistics')
+    if meta.get('components'):
+        text += (f", projected onto the {meta['components']} principal components explaining "
+                 f"{meta['explained_variance']:.0%} of their variance")
+    return text + '.'
+
+@st.cache_resource(show_spinner=False)
+def _headshots():
+    perf.miss()
+    return HeadshotResolver()
+
+
+# function to return the stats of a season or 'All Years', indexed by player id
+@perf.cached
+def stats(year):
+    if year != 'All Years':
+        return season(year).stats
+    return _stats(year, _version(_stats, year, stats_files(year)))
+
+# function to return the name index used for player lookups and search
+@perf.cached
+def name_index(year):
+    if year != 'All Years':
+        return season(year).name_index
+    return _name_index(year, _version(_name_index, year, stats_files(year)))
+
+# function to return the player ids and standardized features of a year
+@perf.cached
+def features(year):
+    if year != 'All Years':
+        return season(year).features
+    return _features(year, _version(_features, year, artifact_files(year, 'features.npy')))
+
+# function to return the metric a year was built with and its fitted transform, the pages
+# always compare players with the metric the artifacts were built with
+@perf.cached
+def metric(year):
+    if year != 'All Years':
+        return season(year).metric
+    files = artifact_files(year, 'meta.json', 'transform.npy')
+    return _metric(year, _version(_metric, year, files))
+
+# function to return the nearest neighbor index of a year, over the features in the space
+# the artifacts were built in, projected when built with a projection and transformed by the metric
+@perf.cached
+def index(year):
+    if year != 'All Years':
+        return season(year).index
+    files = artifact_files(year, 'features.npy', 'meta.json', 'transform.npy', 'projection.npy')
+    return _index(year, _version(_index, year, files))
+
+# function to return the similarity queries of stat lines that are not in a year's dataset,
+# see stat_lines.StatLineQuery
+@perf.cached
+def stat_lines(year):
+    if year != 'All Years':
+        return season(year).stat_lines
+    files = artifact_files(year, 'features.npy', 'meta.json', 'transform.npy', 'projection.npy',
+                           'scaler.npy', 'quantiles.npy')
+    return _stat_lines(year, _version(_stat_lines, year, files))
+
+# function to return the precomputed nearest neighbor table of a year
+@perf.cached
+def neighbors(year):
+    if year != 'All Years':
+        return season(year).neighbors
+    files = artifact_files(year, 'meta.json', 'neighbors_idx.npy', 'neighbors_dist.npy')
+    return _neighbors(year, _version(_neighbors, year, files))
+
+# function to return the distance statistics of a year precomputed by the pipeline
+@perf.cached
+def distance_stats(year):
+    if year != 'All Years':
+        return season(year).distance_stats
+    files = artifact_files(year, 'meta.json', 'quantiles.npy')
+    return _distance_stats(year, _version(_distance_stats, year, files))
+
+# function to return the comparison chart data of players of a year on the chosen stats,
+# see comparison.comparison_frame, memoized by the player ids and stats
+@perf.cached
+def comparison(year, player_ids, chart_stats):
+    version = _version(_comparison, year, stats_files(year))
+    return _comparison(year, version, tuple(player_ids), tuple(chart_stats))
+
+# function to return the sentence describing how similarity is calculated, from the metric
+# and projection the artifacts of a year were built with, every year is built alike
+@perf.cached
+def similarity_method(year='All Years'):
+    files = artifact_files(year, 'meta.json')
+    return _similarity_method(year, _version(_similarity_method, year, files))
+
+# function to return the headshot resolver shared by every session
+@perf.cached
+def headshots():
+    return _headshots()
+
+# function to return the max distance between any two players of a year
+def max_distance(year):
+    return distance_stats(year).max_distance
+
+# function to return the similarity scores of a player to each of the given player ids,
+# the distance relative to the max distance of the year subtracted from 1
+@perf.timed
+def similarity(year, player_id, other_ids):
+    d = index(year).distances_to(player_id, other_ids)
+    return 1 - d/max_distance(year)
+
+# function to return the feature names of a year, in the order of the feature matrix
+def feature_names(year):
+    return feature_columns(stats(year).columns)
+
+# function to return the similarity space of a subset of the stats with per stat weights,
+# kept in the shared least recently used cache of weighted spaces
+@perf.cached
+def weighted_space(year, weights):
+    ids, scaled = features(year)
+    year_metric = metric(year)[0]
+    names = feature_names(year)
+    key = weight_key(names, weights)
+    # the stamps of the features and metric files, so a rebuild makes new keys and the
+    # spaces of the old features age out of the cache
+    dataset = (year, stamps(artifact_files(year, 'features.npy', 'meta.json', 'transform.npy')))
+
+    def build():
+        perf.miss()
+        groups = player_groups(ids) if year == 'All Years' else None
+        return WeightedSpace(ids, scaled, names, key, groups, year_metric)
+    return SPACES.get(dataset + (key,), build)
@@ -7,19 +7,18 @@ NBA Stats Data Cleansing
 @author: Josh Phelan
 """
 
-import numpy as np
-from clean import clean
+from pipeline import YEARS, build_season_stats, run_parallel, print_report
 
-start = 1980
-end = 2017
-interval = 4
+# number of seasons cleaned at once, None uses every cpu
+workers = None
 
-years = list(np.arange(start, end, interval))
-years.append(2022)
+# also export each season's combined stats as csv
+csv = False
 
-for year in years:
-    year = f'{year}'
-    stats = clean(year)
-    
-    # Save final dataframe of combined stats
-    stats.to_csv('data/NBA ' + year +' Combined Stats.csv')
+# Rebuilds every season, use python pipeline.py to rebuild only what changed
+# the guard keeps worker processes from rerunning the build when they import this file
+if __name__ == '__main__':
+    # Save final dataframe of combined stats for each season to the stats dataset
+    results = run_parallel([('stats ' + year, build_season_stats, (year,), {'csv': csv})
+                            for year in YEARS], workers)
+    print_report(results)
@@ -7,21 +7,37 @@ Similar NBA Player Preprocessing
 @author: Josh Phelan
 """
 
-import pickle 
-import numpy as np
-from preprocess import preprocess
-
-start = 1980
-end = 2017
-interval = 4
-
-years = list(np.arange(start, end, interval))
-years.append(2022)
-
-for year in years:
-    year = f'{year}'
-    dist_dict = preprocess(year)
-    
-    # Save distance dictionary as pickle file
-    with open('data/dist_dict_'+ year +'.pkl', 'wb') as f:
-        pickle.dump(dist_dict, f)
+from pipeline import YEARS, build_artifacts, run_parallel, print_report
+from loader import write_manifest
+
+# precision of the distance matrix, 'float32' halves memory at ~1e-6 error, 'uint16' and
+# 'uint8' store it quantized in a quarter and an eighth of the memory, see pipeline.build_artifacts
+dtype = 'float64'
+
+# number of nearest neighbors stored for each player
+k = 50
+
+# set to True to also save the n x n distance matrix, which only the benchmarks read
+full_matrix = False
+
+# distance the players are compared with, 'euclidean', 'cosine' or 'mahalanobis'
+metric = 'euclidean'
+
+# share of the variance the PCA projection of the features keeps, e.g. 0.95, None keeps
+# every standardized stat
+variance = None
+
+# number of seasons preprocessed at once, None uses every cpu
+workers = None
+
+# Rebuilds every season, use python pipeline.py to rebuild only what changed
+# the guard keeps worker processes from rerunning the build when they import this file
+if __name__ == '__main__':
+    # Save features, top k neighbors and distance statistics to data/artifacts
+    results = run_parallel([('artifacts ' + year, build_artifacts, (year,), {'dtype': dtype, 'k': k, 'full_matrix': full_matrix, 'metric': metric,
+                                                                    'variance': variance})
+                            for year in YEARS], workers)
+    print_report(results)
+
+    # Record the hash of every artifact so the app can verify what it loads
+    write_manifest()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:16:08 2026
+
+Combined Stats Dataset
+
+The combined stats of every season stored as one Parquet dataset partitioned by
+season, with categorical Pos and Tm columns and float32 stats.
+
+@author: Josh Phelan
+"""
+
+
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from loader import temp_file
+
+STATS_DIR = os.environ.get('NBA_STATS_DIR', 'data/stats')
+
+# columns stored as categoricals, every other column except Player is a float32 stat
+CATEGORICAL = ['Pos', 'Tm']
+TEXT = ['Player']
+
+# stats that are always whole numbers, shown as integers
+INTEGER_COLUMNS = ['Age', 'G']
+
+# the partition key is kept as text so '1980' filters match the season names used everywhere
+PARTITIONING = ds.partitioning(pa.schema([('season', pa.string())]), flavor='hive')
+
+# function to return the path of the file holding a season's stats
+def season_path(year, stats_dir=STATS_DIR):
+    return os.path.join(stats_dir, 'season=' + f'{year}', 'stats.parquet')
+
+# function to cast the cleaned stats to the dataset's dtypes
+def typed(stats):
+    stats = stats.copy()
+    for col in stats.columns:
+        if col in CATEGORICAL:
+            stats[col] = stats[col].astype('category')
+        elif col in TEXT:
+            stats[col] = stats[col].astype(str)
+        else:
+            stats[col] = stats[col].astype(np.float32)
+    return stats
+
+# writes a season's stats to its partition through a temp file and rename,
+# the temp file starts with a dot so readers never pick it up
+def write_season(stats, year, stats_dir=STATS_DIR):
+    path = season_path(year, stats_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(typed(stats).reset_index(), preserve_index=False)
+
+    fd, tmp = temp_file(path, prefix='.')
+    os.close(fd)
+    try:
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+# function to read the stats of a season or 'All Years', indexed by player id
+# columns limits the columns read, and seasons limits which seasons 'All Years' reads
+# for all years the ids and names are suffixed with the season, e.g. 'jamesle01' and
+# 'LeBron James' become 'jamesle012016' and 'LeBron James (2016)'
+def read_stats(year='All Years', columns=None, seasons=None, stats_dir=STATS_DIR):
+    dataset = ds.dataset(stats_dir, format='parquet', partitioning=PARTITIONING)
+    all_years = year == 'All Years'
+    if not all_years:
+        seasons = [f'{year}']
+
+    if columns is None:
+        columns = [col for col in dataset.schema.names if col not in ('ID', 'season')]
+    read = ['ID'] + list(columns)
+    if all_years:
+        read.append('season')
+
+    selected = None if seasons is None else ds.field('season').isin([f'{s}' for s in seasons])
+    stats = dataset.to_table(columns=read, filter=selected).to_pandas()
+
+    if all_years:
+        stats['ID'] = stats['ID'] + stats['season']
+        if 'Player' in stats:
+            stats['Player'] = stats['Player'] + ' (' + stats['season'] + ')'
+        stats = stats.drop('season', axis=1)
+
+    stats = stats.set_index('ID')
+
+    # Confirm no duplicates
+    if stats.index.duplicated().any():
+        raise ValueError('Duplicate player ids in the stats of ' + f'{year}')
+    return stats
+
+# function to return stats with the float32 columns as float64 rounded to the 3 decimals
+# basketball reference publishes, so tables and charts show 19.2 rather than 19.200001,
+# and the columns in INTEGER_COLUMNS as integers, decided by column rather than by the
+# values so a stat has the same type in every table
+def for_display(stats):
+    floats = stats.columns[stats.dtypes == np.float32]
+    values = stats[floats].to_numpy(np.float64).round(3)
+
+    # one new frame rather than assigning column by column, which copies the frame each time
+    converted = {col: values[:, j].astype(np.int64) if col in INTEGER_COLUMNS else values[:, j]
+                 for j, col in enumerate(floats)}
+    return pd.DataFrame({col: converted[col] if col in converted else stats[col]
+                         for col in stats.columns}, index=stats.index)
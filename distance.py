@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:12:03 2026
+
+Pairwise Distance Engine
+
+@author: Josh Phelan
+"""
+
+
+import numpy as np
+
+# function to compute the euclidean distance matrix between the rows of x and the rows of y
+# in a single matrix product: ||a-b||^2 = ||a||^2 + ||b||^2 - 2ab
+# when y is not given, the distances between every pair of rows in x are returned
+def pairwise_distances(x, y=None, dtype=np.float64):
+    same = y is None
+    x = np.asarray(x, dtype=dtype)
+    y = x if same else np.asarray(y, dtype=dtype)
+
+    # squared norm of every row, shaped so it broadcasts across rows and columns
+    x_norms = np.einsum('ij,ij->i', x, x)
+    y_norms = x_norms if same else np.einsum('ij,ij->i', y, y)
+
+    d2 = x_norms[:, None] + y_norms[None, :]
+    d2 -= 2 * (x @ y.T)
+
+    # rounding can leave tiny negative values where players are nearly identical
+    np.maximum(d2, 0, out=d2)
+    if same:
+        np.fill_diagonal(d2, 0)
+
+    return np.sqrt(d2, out=d2)
+
+# percentiles stored for each player's distances, 0, 50 and 100 are the min, median and max
+PERCENTILES = np.arange(101)
+
+# function to find the max and mean distance between different players and the
+# percentiles of each player's distances to everyone else, one block of rows at a
+# time so the full matrix is never held in memory
+def distance_stats(x, block_size=1024, percentiles=PERCENTILES):
+    n = len(x)
+    max_d = 0.0
+    total = 0.0
+    quantiles = np.empty((n, len(percentiles)))
+    for start in range(0, n, block_size):
+        block = pairwise_distances(x[start:start + block_size], x)
+        rows = np.arange(len(block))
+        block[rows, start + rows] = 0
+        max_d = max(max_d, float(block.max()))
+        total += float(block.sum())
+
+        # each row sorted ascending starts with the player's zero distance to itself
+        block.sort(axis=1)
+        quantiles[start:start + block_size] = np.percentile(block[:, 1:], percentiles, axis=1).T
+
+    # the diagonal is zero, so average over the n*(n-1) pairs of different players
+    return max_d, total / (n * (n - 1)), quantiles
+
+# function to find the max and mean distance between different players, one block of
+# rows at a time, without the percentiles of distance_stats
+def max_mean_distance(x, block_size=1024):
+    n = len(x)
+    max_d = 0.0
+    total = 0.0
+    for start in range(0, n, block_size):
+        block = pairwise_distances(x[start:start + block_size], x)
+        rows = np.arange(len(block))
+        block[rows, start + rows] = 0
+        max_d = max(max_d, float(block.max()))
+        total += float(block.sum())
+    return max_d, total / (n * (n - 1))
+
+# function to return the scale that maps distances from 0 to max_d onto the whole range of
+# an unsigned integer dtype, the distance one step of the quantized values stands for
+def quantize_scale(max_d, dtype):
+    return (float(max_d) or 1.0) / np.iinfo(dtype).max
+
+# function to quantize distances to unsigned integers of dtype, each distance rounded to
+# the nearest multiple of scale, so the error is at most scale / 2
+def quantize(d, scale, dtype):
+    return np.rint(np.asarray(d, dtype=np.float64) / scale).astype(dtype)
+
+# function to return the distances that quantized values stand for
+def dequantize(q, scale):
+    return np.asarray(q, dtype=np.float64) * scale
+
+# function to order the k smallest distances of each row of candidates, ties broken by
+# position so results match a stable sort of the full row
+def _select_k(positions, d, k):
+    if d.shape[1] > k:
+        # unordered k smallest of each row, then order just those k
+        part = np.argpartition(d, k - 1, axis=1)[:, :k]
+        positions = np.take_along_axis(positions, part, axis=1)
+        d = np.take_along_axis(d, part, axis=1)
+    order = np.lexsort((positions, d), axis=1)
+    return np.take_along_axis(positions, order, axis=1), np.take_along_axis(d, order, axis=1)
+
+# function to find the k nearest players to every player without sorting whole rows
+# returns fixed width arrays of neighbor positions and distances, closest first
+def top_k(distances, k):
+    n = len(distances)
+    k = min(k, n - 1)
+
+    d = np.array(distances, copy=True)
+    # a player is never its own neighbor
+    np.fill_diagonal(d, np.inf)
+
+    positions = np.broadcast_to(np.arange(n), d.shape)
+    indices, neighbor_d = _select_k(positions, d, k)
+
+    return indices.astype(np.int32), neighbor_d
+
+# function to find the k nearest rows of x to each row of queries, where exclude holds the
+# position in x of each query's own row, which is never its own neighbor
+# same output format as top_k
+def query_top_k(queries, x, k, exclude, dtype=np.float64):
+    d = pairwise_distances(queries, x, dtype=dtype)
+    d[np.arange(len(d)), exclude] = np.inf
+    k = min(k, len(x) - 1)
+
+    positions = np.broadcast_to(np.arange(len(x)), d.shape)
+    indices, neighbor_d = _select_k(positions, d, k)
+
+    return indices.astype(np.int32), neighbor_d
+
+# function to find the k nearest players to every player one block_size x block_size tile of
+# distances at a time, keeping a running top k for each row block, so memory stays bounded
+# no matter how many players there are. When out is given, e.g. a memory mapped n x n
+# array, every tile is also written to it, quantized with scale when scale is given
+# Same output format as top_k
+def tiled_top_k(x, k, block_size=1024, dtype=np.float64, out=None, scale=None):
+    x = np.asarray(x, dtype=dtype)
+    n = len(x)
+    k = min(k, n - 1)
+    indices = np.empty((n, k), dtype=np.int32)
+    neighbor_d = np.empty((n, k), dtype=dtype)
+
+    for start in range(0, n, block_size):
+        rows = x[start:start + block_size]
+        best = np.empty((len(rows), 0), dtype=np.int64)
+        best_d = np.empty((len(rows), 0), dtype=dtype)
+
+        for col in range(0, n, block_size):
+            tile = pairwise_distances(rows, x[col:col + block_size], dtype=dtype)
+            # positions of each row's own player when it falls in this tile
+            own = np.arange(max(start, col), min(start + len(rows), col + tile.shape[1]))
+            tile[own - start, own - col] = 0
+            if out is not None:
+                out[start:start + len(rows), col:col + tile.shape[1]] = (
+                    tile if scale is None else quantize(tile, scale, out.dtype))
+
+            # a player is never its own neighbor
+            tile[own - start, own - col] = np.inf
+            positions = np.broadcast_to(np.arange(col, col + tile.shape[1]), tile.shape)
+            best, best_d = _select_k(np.concatenate((best, positions), axis=1),
+                                     np.concatenate((best_d, tile), axis=1), k)
+
+        indices[start:start + len(rows)] = best
+        neighbor_d[start:start + len(rows)] = best_d
+
+    if out is not None and hasattr(out, 'flush'):
+        out.flush()
+    return indices, neighbor_d
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:01:58 2026
+
+Headshot Resolver
+
+@author: Josh Phelan
+"""
+
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+
+HEADSHOT_URL = 'https://www.basketball-reference.com/images/players/'
+LOGO_URL = 'https://upload.wikimedia.org/wikipedia/en/thumb/0/03/National_Basketball_Association_logo.svg/105px-National_Basketball_Association_logo.svg.png'
+HEADSHOT_DIR = os.environ.get('NBA_HEADSHOT_DIR', 'data/headshots')
+
+# leading bytes of the image formats basketball reference serves
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG', b'GIF8', b'RIFF')
+
+# function to return the deadline for all headshots on a page, seconds from now
+def page_deadline(seconds=3.0):
+    return time.monotonic() + seconds
+
+
+class HeadshotResolver:
+    # resolves player ids to headshot urls, checking concurrently and caching which players
+    # have a photo and which do not on disk so reruns do not hit the network, the pages
+    # show the photos from their urls so only the first bytes of a photo are read
+    def __init__(self, base_url=HEADSHOT_URL, fallback_url=LOGO_URL, cache_dir=HEADSHOT_DIR,
+                 max_workers=8, request_timeout=5.0, negative_ttl=7*24*3600):
+        self.base_url = base_url
+        self.fallback_url = fallback_url
+        self.cache_dir = cache_dir
+        self.request_timeout = request_timeout
+        self.negative_ttl = negative_ttl
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix='headshots')
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    # url of the headshot for a player id
+    def url(self, player_id):
+        return self.base_url + player_id + '.jpg'
+
+    def _found_path(self, player_id):
+        return os.path.join(self.cache_dir, player_id + '.found')
+
+    def _missing_path(self, player_id):
+        return os.path.join(self.cache_dir, player_id + '.missing')
+
+    # cached url for a player, None when the player has not been fetched yet
+    def cached(self, player_id):
+        if os.path.exists(self._found_path(player_id)):
+            return self.url(player_id)
+        try:
+            age = time.time() - os.path.getmtime(self._missing_path(player_id))
+        except FileNotFoundError:
+            return None
+        # players without a photo get the fallback until the negative cache expires
+        return self.fallback_url if age < self.negative_ttl else None
+
+    # checks a headshot and records the result on disk, returns the resolved url
+    def _fetch(self, player_id):
+        try:
+            return self._check(player_id)
+        finally:
+            with self._lock:
+                self._pending.pop(player_id, None)
+
+    def _check(self, player_id):
+        try:
+            # only the leading bytes are read, enough to tell a photo from an error page
+            with requests.get(self.url(player_id), timeout=self.request_timeout,
+                              stream=True) as response:
+                head = next(response.iter_content(16), b'')
+        except requests.RequestException:
+            # network errors are not cached so the photo is retried on the next rerun
+            return self.fallback_url
+
+        if response.status_code == 200 and head.startswith(IMAGE_SIGNATURES):
+            with open(self._found_path(player_id), 'w'):
+                pass
+            return self.url(player_id)
+
+        if response.status_code in (200, 404):
+            # player has no photo, remember that until the negative cache expires
+            with open(self._missing_path(player_id), 'w'):
+                pass
+        return self.fallback_url
+
+    # starts fetching a player's headshot unless it is cached or already in flight
+    def _submit(self, player_id):
+        with self._lock:
+            future = self._pending.get(player_id)
+            if future is None:
+                future = self._pool.submit(self._fetch, player_id)
+                self._pending[player_id] = future
+        return future
+
+    # list of headshot urls for the given player ids, in the same order
+    # waits until the deadline at most, players still loading get the fallback url
+    def resolve(self, player_ids, deadline=None):
+        urls = [self.cached(player_id) for player_id in player_ids]
+        futures = {i: self._submit(player_id)
+                   for i, (player_id, url) in enumerate(zip(player_ids, urls)) if url is None}
+
+        if futures:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            wait(futures.values(), timeout=timeout)
+
+        for i, future in futures.items():
+            urls[i] = future.result() if future.done() else self.fallback_url
+        return urls
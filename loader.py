@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:21:36 2026
+
+Artifact Loader
+
+Resolves artifacts from a local directory, verified against the sha256 hashes
+in the manifest. Missing files are streamed once from an optional remote and
+kept locally, so every later process reads the local copy.
+
+@author: Josh Phelan
+"""
+
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+# local artifact directory and optional remote base url, configurable per deployment
+ARTIFACT_DIR = os.environ.get('NBA_ARTIFACT_DIR', 'data/artifacts')
+ARTIFACT_URL = os.environ.get('NBA_ARTIFACT_URL')
+
+MANIFEST = 'manifest.json'
+CHUNK_SIZE = 1 << 20
+
+
+class HttpRemote:
+    # remote that serves artifacts over http below a base url, any static file server works
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    # returns a readable stream for an artifact path relative to the artifact directory
+    def open(self, relpath):
+        return urllib.request.urlopen(self.base_url + '/' + relpath.replace(os.sep, '/'),
+                                      timeout=self.timeout)
+
+# function to return the remote configured by NBA_ARTIFACT_URL, if any
+def default_remote():
+    return HttpRemote(ARTIFACT_URL) if ARTIFACT_URL else None
+
+# function to return the sha256 hex digest of a file, read in chunks
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+# function to create a temp file next to path to write and rename into place, returns
+# the open file descriptor and temp path, mkstemp makes files only the owner can read
+def temp_file(path, prefix='tmp'):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=prefix, suffix='.part')
+    os.chmod(tmp, 0o644)
+    return fd, tmp
+
+# writes the manifest of every artifact below the artifact directory with its hash and size
+def write_manifest(artifact_dir=ARTIFACT_DIR):
+    files = {}
+    for root, dirs, names in os.walk(artifact_dir):
+        # skip the temp folders of builds in progress or interrupted
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.build-') and '.old-' not in d)
+        for name in sorted(names):
+            if name == MANIFEST or name.endswith(('.verified', '.part')):
+                continue
+            path = os.path.join(root, name)
+            relpath = os.path.relpath(path, artifact_dir).replace(os.sep, '/')
+            files[relpath] = {'sha256': file_hash(path), 'size': os.path.getsize(path)}
+
+    # write to a temp file and rename so readers never see a partial manifest
+    path = os.path.join(artifact_dir, MANIFEST)
+    fd, tmp = temp_file(path)
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'files': files}, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+    return files
+
+# function to read the manifest, fetching it from the remote when there is no local copy
+def load_manifest(artifact_dir=ARTIFACT_DIR, remote=None):
+    path = os.path.join(artifact_dir, MANIFEST)
+    if not os.path.exists(path) and remote is not None:
+        _download(remote, MANIFEST, path)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)['files']
+
+# streams a remote artifact to a temp file next to its destination, then renames it into place
+def _download(remote, relpath, path, expected=None):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    logger.info('Downloading artifact %s', relpath)
+
+    h = hashlib.sha256()
+    fd, tmp = temp_file(path)
+    try:
+        with os.fdopen(fd, 'wb') as out, remote.open(relpath) as src:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                h.update(chunk)
+                out.write(chunk)
+        if expected is not None and h.hexdigest() != expected['sha256']:
+            raise ValueError(f'Checksum mismatch for downloaded artifact {relpath}')
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+# records that a local file matches its manifest entry, keyed on size and modification time
+def _stamp(path, expected):
+    st = os.stat(path)
+    return f"{expected['sha256']} {st.st_size} {st.st_mtime_ns}"
+
+# function to check a local file against its manifest entry, the result is stamped
+# next to the file so later processes only compare size and modification time
+def _verified(path, expected):
+    stamp_path = path + '.verified'
+    stamp = _stamp(path, expected)
+
+    if os.path.exists(stamp_path):
+        with open(stamp_path) as f:
+            if f.read() == stamp:
+                return True
+
+    if os.path.getsize(path) != expected['size'] or file_hash(path) != expected['sha256']:
+        return False
+    with open(stamp_path, 'w') as f:
+        f.write(stamp)
+    return True
+
+# function to return the local path of a verified artifact, downloading it from the remote if needed
+def resolve(relpath, artifact_dir=ARTIFACT_DIR, remote=None):
+    relpath = relpath.replace(os.sep, '/')
+    path = os.path.join(artifact_dir, relpath)
+    manifest = load_manifest(artifact_dir, remote)
+    expected = manifest.get(relpath)
+
+    if os.path.exists(path):
+        if expected is None:
+            logger.warning('Artifact %s is not in the manifest, skipping verification', relpath)
+            return path
+        if _verified(path, expected):
+            return path
+        logger.warning('Local artifact %s does not match the manifest', relpath)
+        if remote is None:
+            raise ValueError(f'Checksum mismatch for local artifact {relpath}')
+
+    if remote is None:
+        raise FileNotFoundError(f'Artifact {relpath} not found in {artifact_dir}, '
+                                'build it with the preprocessing scripts or set NBA_ARTIFACT_URL')
+
+    _download(remote, relpath, path, expected)
+    if expected is not None:
+        # the download was hashed while streaming, stamp it so it is not hashed again
+        with open(path + '.verified', 'w') as f:
+            f.write(_stamp(path, expected))
+    return path
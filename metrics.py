@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:49:15 2026
+
+Distance Metrics
+
+Registry of the distances players can be compared with. Every metric is a
+transform of the standardized features after which plain euclidean distance is
+the metric's distance, so all of them run through the same pairwise distance
+kernel, top k selection and KD-tree. Transforms that depend on the data, like
+the Mahalanobis whitening, are fitted once per dataset by the pipeline and
+stored beside the features.
+
+@author: Josh Phelan
+"""
+
+
+import numpy as np
+
+# share of the identity mixed into the covariance before whitening. Several stats are
+# exact sums of others up to rounding (PTS, TRB, WS, BPM), which leaves covariance
+# eigenvalues near 0, and whitening the raw covariance would blow the rounding noise
+# in those directions up to as much weight as any real difference between players
+MAHALANOBIS_SHRINKAGE = 0.1
+
+METRICS = {}
+
+# class decorator adding a metric to the registry under its name
+def register(cls):
+    METRICS[cls.name] = cls()
+    return cls
+
+# function to return a registered metric by name
+def get_metric(name):
+    try:
+        return METRICS[name]
+    except KeyError:
+        raise ValueError('Unknown metric ' + f'{name}' + ', choose from ' + ', '.join(METRICS))
+
+
+class Metric:
+    # a distance between rows of standardized features, as a transform into a space
+    # where euclidean distance is the metric's distance, label names it on the pages
+    name = None
+    label = None
+
+    # function to fit the metric's transform to a dataset's features, None when the
+    # transform does not depend on the data
+    def fit(self, x):
+        return None
+
+    # function to return the features in the metric's space, fitted is the result of fit
+    def transform(self, x, fitted=None):
+        return np.asarray(x, dtype=np.float64)
+
+
+@register
+class Euclidean(Metric):
+    # straight line distance between the standardized stats, every stat counts evenly
+    name = 'euclidean'
+    label = 'Euclidean distance'
+
+
+@register
+class Cosine(Metric):
+    # angle between stat profiles regardless of their size, rows are scaled to unit
+    # length so the euclidean distance is sqrt(2 - 2 cos), which orders players exactly
+    # like the cosine distance 1 - cos
+    name = 'cosine'
+    label = 'cosine distance'
+
+    def transform(self, x, fitted=None):
+        x = np.asarray(x, dtype=np.float64)
+        norms = np.linalg.norm(x, axis=1, keepdims=True)
+        # a player exactly at the mean of every stat has no direction and stays at 0
+        return x / np.where(norms > 0, norms, 1)
+
+
+@register
+class Mahalanobis(Metric):
+    # distance that discounts correlated stats, FG, FGA and PTS move together and are
+    # counted about once rather than three times. fit precomputes the whitening matrix
+    # inv(L).T of the Cholesky factor L of the shrunk covariance, after which euclidean
+    # distance is the Mahalanobis distance
+    name = 'mahalanobis'
+    label = 'Mahalanobis distance'
+
+    def __init__(self, shrinkage=MAHALANOBIS_SHRINKAGE):
+        self.shrinkage = shrinkage
+
+    def fit(self, x):
+        cov = np.atleast_2d(np.cov(np.asarray(x, dtype=np.float64), rowvar=False))
+        cov = (1 - self.shrinkage) * cov + self.shrinkage * np.eye(len(cov)) * np.trace(cov) / len(cov)
+        chol = np.linalg.cholesky(cov)
+        return np.linalg.inv(chol).T
+
+    def transform(self, x, fitted=None):
+        if fitted is None:
+            fitted = self.fit(x)
+        return np.asarray(x, dtype=np.float64) @ fitted
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:40:19 2026
+
+Nearest Neighbor Query Engine
+
+@author: Josh Phelan
+"""
+
+
+import logging
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+logger = logging.getLogger(__name__)
+
+# function to map each player season id to a code for the player, the all years
+# ids are the basketball reference id followed by the 4 digit season
+def player_groups(ids):
+    codes = pd.factorize(pd.Index(ids).str[:-4])[0]
+    return codes
+
+
+class PlayerGroups:
+    # positions of each player's seasons laid out contiguously, computed once so
+    # per group reductions over a row of distances are a single reduceat
+    def __init__(self, codes):
+        self.codes = np.asarray(codes)
+        self.order = np.argsort(self.codes, kind='stable')
+        sizes = np.bincount(self.codes)
+        self.starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        self.ends = self.starts + sizes
+
+    def __len__(self):
+        return len(self.starts)
+
+# function to find the k nearest distinct players in a row of distances, keeping each
+# player's closest season and skipping every season in the exclude group, e.g. the queried
+# player's own, None skips none. Returns positions and distances, closest first
+def distinct_top_k(row, groups, exclude, k):
+    d = np.asarray(row, dtype=np.float64)[groups.order]
+
+    # closest season of every player
+    group_min = np.minimum.reduceat(d, groups.starts)
+    if exclude is None:
+        k = min(k, len(groups))
+    else:
+        group_min[exclude] = np.inf
+        k = min(k, len(groups) - 1)
+
+    best = np.argpartition(group_min, k - 1)[:k]
+    # position of each chosen player's closest season, the earliest one on ties
+    positions = np.array([groups.order[groups.starts[g] + np.argmin(d[groups.starts[g]:groups.ends[g]])]
+                          for g in best], dtype=np.int64)
+    best_d = group_min[best]
+
+    order = np.lexsort((positions, best_d))
+    return positions[order], best_d[order]
+
+
+class NeighborIndex:
+    # exact euclidean nearest neighbor queries over the standardized feature matrix
+    # using a KD-tree, so no n x n distance matrix is needed
+    # groups holds a player code for each row, see player_groups, and defaults to
+    # every row being its own player
+    def __init__(self, ids, features, leaf_size=40, groups=None):
+        self.ids = ids
+        self.features = np.asarray(features, dtype=np.float64)
+        self.groups = PlayerGroups(np.arange(len(ids)) if groups is None else groups)
+
+        start = perf_counter()
+        self.tree = KDTree(self.features, leaf_size=leaf_size)
+        self.build_time = perf_counter() - start
+        self.last_query_time = 0.0
+
+        logger.info('Built KD-tree over %d players in %.1f ms',
+                    len(ids), self.build_time * 1000)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # row position of a player id
+    def position(self, player_id):
+        return self.ids.get_loc(player_id)
+
+    # ids and distances of the k nearest players to a player, closest first
+    def nearest(self, player_id, k=5):
+        j = self.position(player_id)
+        k = min(k, len(self) - 1)
+
+        start = perf_counter()
+        # ask for one extra neighbor since the player is its own closest match
+        d, idx = self.tree.query(self.features[[j]], k=k + 1)
+        self.last_query_time = perf_counter() - start
+        logger.debug('Queried %d nearest to %s in %.2f ms',
+                     k, player_id, self.last_query_time * 1000)
+
+        keep = idx[0] != j
+        return self.ids[idx[0][keep][:k]], d[0][keep][:k]
+
+    # ids and distances of the k nearest distinct players to a player, using each
+    # player's closest season and leaving out the player's own other seasons
+    def distinct_nearest(self, player_id, k=5):
+        j = self.position(player_id)
+
+        start = perf_counter()
+        diff = self.features - self.features[j]
+        row = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+        positions, d = distinct_top_k(row, self.groups, self.groups.codes[j], k)
+        self.last_query_time = perf_counter() - start
+        logger.debug('Queried %d nearest distinct players to %s in %.2f ms',
+                     k, player_id, self.last_query_time * 1000)
+
+        return self.ids[positions], d
+
+    # ids and distances of the k nearest players to a point in the feature space that need
+    # not be a player, e.g. a new stat line, closest first
+    def query(self, point, k=5):
+        k = min(k, len(self))
+
+        start = perf_counter()
+        d, idx = self.tree.query(np.asarray(point, dtype=np.float64).reshape(1, -1), k=k)
+        self.last_query_time = perf_counter() - start
+        return self.ids[idx[0]], d[0]
+
+    # ids and distances of the k nearest distinct players to a point in the feature space,
+    # using each player's closest season
+    def distinct_query(self, point, k=5):
+        start = perf_counter()
+        diff = self.features - np.asarray(point, dtype=np.float64)
+        row = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+        positions, d = distinct_top_k(row, self.groups, None, k)
+        self.last_query_time = perf_counter() - start
+        return self.ids[positions], d
+
+    # distance between two players
+    def distance(self, player_1, player_2):
+        diff = self.features[self.position(player_1)] - self.features[self.position(player_2)]
+        return float(np.sqrt(diff @ diff))
+
+    # distances from a player to each of the given player ids
+    def distances_to(self, player_id, other_ids):
+        diff = self.features[self.ids.get_indexer(other_ids)] - self.features[self.position(player_id)]
+        return np.sqrt(np.einsum('ij,ij->i', diff, diff))
+
+    # k nearest neighbors of every player in the same format as distance.top_k
+    def top_k(self, k):
+        k = min(k, len(self) - 1)
+
+        start = perf_counter()
+        d, idx = self.tree.query(self.features, k=k + 1)
+        logger.info('Queried %d nearest for %d players in %.1f ms',
+                    k, len(self), (perf_counter() - start) * 1000)
+
+        # drop each player from its own row, falling back to the last column
+        # when a duplicate player pushed it out of the first position
+        own = idx == np.arange(len(self))[:, None]
+        own[~own.any(axis=1), -1] = True
+        keep = ~own
+        indices = idx[keep].reshape(len(self), k).astype(np.int32)
+        neighbor_d = d[keep].reshape(len(self), k)
+
+        return indices, neighbor_d
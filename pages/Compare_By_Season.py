@@ -7,17 +7,21 @@ Compare By Seasons Page
 @author: Josh Phelan
 """
 
-import pandas as pd
 import numpy as np
 from random import sample
-import pickle 
+from dataset import for_display
+import data_access
 from st_aggrid import AgGrid, JsCode
 from st_aggrid.grid_options_builder import GridOptionsBuilder
 import altair as alt
-import PIL
-import requests
-from io import BytesIO
+from headshots import page_deadline
+from search import player_select
+from weighted import similarity_controls
 import streamlit as st
+import perf
+
+# time the stages of each rerun when NBA_PERF is set or the page is opened with ?perf=1
+perf.start_page('Compare By Season')
 
 st.title('NBA Player Similarity')
 
@@ -31,7 +35,7 @@ with st.sidebar:
         st.write("")
         
     st.markdown(" ## NBA Player Similarity App")
-    st.markdown("This app calculates the similarity score between NBA players from the 1980 to 2016 seasons at 4 year intervals, and the 2021-2022 season. Similarity is calculated based on Euclidean distance from standardized per game and advanced statistics. Data provided by [Basketball Reference](https://www.basketball-reference.com/).")
+    st.markdown("This app calculates the similarity score between NBA players from the 1980 to 2016 seasons at 4 year intervals, and the 2021-2022 season. " + data_access.similarity_method() + " Data provided by [Basketball Reference](https://www.basketball-reference.com/).")
     st.sidebar.info("See the code on my [Github](https://github.com/joshphelan/nba-player-similarity).", icon="🔗")
     st.markdown('*Developed by Josh Phelan*')
 
@@ -41,48 +45,28 @@ st.write('''This page calculates the 5 most similar NBA players from a season to
          First, select the season. Then, select the player you would like to compare to others in
          that same season. Choose a random player for inspiration!''')
     
-# function to return stats data for given year
-@st.cache
-def get_stats_data(year):
-    stats = pd.read_csv('data/NBA ' + year +' Combined Stats.csv',index_col=('ID'))
-    return stats
-
-# function to retrieve distance dictionary for given year
-@st.cache(allow_output_mutation=True)
-def get_dist_data(year):
-    with open('data/dist_dict_'+ year +'.pkl', 'rb') as f:
-        dist_dict = pickle.load(f)
-    return dist_dict
-
 # function to return the top 5 most similar players given a player id
+@perf.timed
 def similar_players(player_id):
     top5 = []
-    top5 = list(dist_dict[player_id].sort_values(by='Distance').head().to_dict(orient = 'index').keys())
-    players = stats.loc[top5]
+    if space is not None:
+        top5 = list(space.nearest(player_id, 5)[0])
+    else:
+        top5 = list(neighbors.nearest(player_id, 5)[0])
+    players = for_display(stats.loc[top5])
     return players
 
-# function to calculate the max distance in the distance dictionary
-def get_max_d():
-    max_list = []
-    for key in dist_dict:
-        max_list.append(max(dist_dict[key]['Distance']))
-    max_d = max(max_list)
-    return max_d
-
 # returns list of similarity scores based on relative distance and max distance
+@perf.timed
 def get_similarity(player_id, df):
-    s_list = []
-    for idx in df.index:
-        d = dist_dict[player_id].loc[idx]['Distance']
-        d_norm = d/max_d
-        s = 1 - d_norm
-        s_list.append(s)
+    if space is not None:
+        return list(space.similarity(space.distances_to(player_id, df.index)))
+    s_list = list(data_access.similarity(year, player_id, df.index))
     return s_list
 
 # function that returns player id given player name
 def get_id(player_name):
-    name = player_name
-    player_id = stats[stats['Player'] == name].index[0]
+    player_id = name_index.id(player_name)
     return player_id
 
 # function to show header for specific player
@@ -106,9 +90,22 @@ def update_year():
 year = st.selectbox("Choose year for comparison:", years, key = "year_box",on_change=update_year)
 
 year = f'{year}'
-stats = get_stats_data(year)
-dist_dict = get_dist_data(year)
-max_d = get_max_d()
+# stats and artifacts shared by every session and page, loaded once per server process
+stats = data_access.stats(year)
+name_index = data_access.name_index(year)
+headshots = data_access.headshots()
+neighbors = data_access.neighbors(year)
+
+# load the seasons before and after this one in the background, the ones most often picked next
+position = years.index(int(year))
+data_access.prefetch([f'{y}' for y in years[max(position - 1, 0):position + 2] if f'{y}' != year])
+
+# seasons held in memory by the server process, shown when the rerun is timed
+if perf.current() is not None:
+    residency = data_access.season_residency()
+    st.sidebar.caption(f"Seasons resident: {residency['resident']} ({residency['nbytes'] / 2 ** 20:.1f} MB), "
+                       f"{residency['hits']} hits, {residency['waits']} waited on a load, {residency['misses']} misses, "
+                       f"{residency['evictions']} evicted, {residency['prefetches']} prefetched")
 
 # initializing player for session state, if none
 if "rand_player" not in st.session_state:
@@ -117,18 +114,30 @@ if "rand_player" not in st.session_state:
 # function that updates player shown in selectbox with random player from stats data
 def update_player():
     st.session_state['rand_player'] = get_random()
+    # search for the random player so it is among the select box options
+    st.session_state['player_box_query'] = st.session_state['rand_player']
+    st.session_state['player_box_page'] = 1
     st.session_state['player_box'] = st.session_state['rand_player']
 
 # select box to choose player
-player = st.selectbox("Choose player:", list(stats['Player']),key="player_box")
+player = player_select("Choose player:", name_index, "player_box")
 
 # randomly samples a player from the stats data
 def get_random():
-    return sample(list(stats['Player']),1)[0]
+    return sample(name_index.names,1)[0]
 
 # button to choose a random player
 st.button("Choose a Random Player", on_click = update_player)
 
+# optional subset of the stats and weights to compute the similarity on instead of all stats
+weights = similarity_controls(data_access.feature_names(year))
+space = data_access.weighted_space(year, weights) if weights else None
+
+# stop here until the search matches a player
+if player is None:
+    perf.finish_page()
+    st.stop()
+
 # getting player id for inputted player
 player_id = get_id(player)
 # list of stats to potentially display from multiselect box
@@ -136,7 +145,7 @@ no_player = [col for col in stats.columns if col != 'Player']
 all_stats = st.multiselect("Select stats to compare:",no_player,['Tm','PTS','TRB','AST'])
 # create dataframe for inputted player
 st.subheader(name(player))
-stats_player = stats.loc[[player_id]]
+stats_player = for_display(stats.loc[[player_id]])
 
 # Display similar players with pictures in AgGrid
 # created on 9/26 with luke
@@ -158,22 +167,12 @@ render_image = JsCode('''
 ''')
 
 
-# function to return contents from url
-def read_file_from_url(url):
-    return requests.get(url).content
+# all headshots on the page share one deadline so a slow site cannot stall the rerun
+deadline = page_deadline()
 
 # create list of the headshot for inputted player from basketball reference
-pics = []
-for idx in stats_player.index:    
-    try:
-        file_bytes = read_file_from_url(
-            "https://www.basketball-reference.com/images/players/"+idx+".jpg"
-            )
-        image = PIL.Image.open(BytesIO(file_bytes))    
-        
-        pics.append("https://www.basketball-reference.com/images/players/"+idx+".jpg")
-    except PIL.UnidentifiedImageError:
-        pics.append("https://upload.wikimedia.org/wikipedia/en/thumb/0/03/National_Basketball_Association_logo.svg/105px-National_Basketball_Association_logo.svg.png")
+with perf.stage('headshots'):
+    pics = headshots.resolve(list(stats_player.index), deadline)
 
 # insert headshot to stats_player dataframe
 stats_player.insert(0,"Pic",pics)
@@ -186,12 +185,13 @@ options_builder.configure_default_column(width=103)
 grid_options = options_builder.build()
 
 # display AgGrid table for inputted player
-AgGrid(stats_player[list("Pic".split(" "))+list("Player".split(" "))+all_stats], 
-        gridOptions = grid_options,
-        allow_unsafe_jscode=True,
-        enable_enterprise_modules=False,
-        #height=125, # set height to 0 in order to display tables. 9/28/23
-        theme='material')
+with perf.stage('tables'):
+    AgGrid(stats_player[list("Pic".split(" "))+list("Player".split(" "))+all_stats], 
+            gridOptions = grid_options,
+            allow_unsafe_jscode=True,
+            enable_enterprise_modules=False,
+            #height=125, # set height to 0 in order to display tables. 9/28/23
+            theme='material')
 
 # retrieve 5 most similar players to inputted player
 players = similar_players(player_id)
@@ -201,17 +201,8 @@ players.insert(1,"Similarity",get_similarity(player_id,players))
 players['Similarity'] = players['Similarity'].apply(lambda x: '{:.2%}'.format(float(x)))
 
 # create list of the headshots for most similar players from basketball reference
-pics = []
-for idx in players.index:    
-    try:
-        file_bytes = read_file_from_url(
-            "https://www.basketball-reference.com/images/players/"+idx+".jpg"
-            )
-        image = PIL.Image.open(BytesIO(file_bytes))    
-        
-        pics.append("https://www.basketball-reference.com/images/players/"+idx+".jpg")
-    except PIL.UnidentifiedImageError:
-        pics.append("https://upload.wikimedia.org/wikipedia/en/thumb/0/03/National_Basketball_Association_logo.svg/105px-National_Basketball_Association_logo.svg.png")
+with perf.stage('headshots'):
+    pics = headshots.resolve(list(players.index), deadline)
 
 # insert headshots to players dataframe
 players.insert(0,"Pic",pics)
@@ -233,46 +224,20 @@ options_builder.configure_selection(selection_mode="single" ,pre_selected_rows=[
 grid_options = options_builder.build()
 
 # display AgGrid table for most similar players
-grid = AgGrid(players[list("Pic".split(" "))+list("Player".split(" "))+all_stats+list("Similarity".split(" "))], 
-        gridOptions = grid_options,
-        allow_unsafe_jscode=True,
-        enable_enterprise_modules=False,
-        theme='material')
-
-# function to return comparison table between inputted player and selected player
-@st.cache
-def get_comp_table(sel_row):
-    comp_id = get_id(sel_row[0]["Player"])
-    comp = pd.concat([stats.loc[player_id],stats.loc[comp_id]],axis=1).transpose()
-    return comp
+with perf.stage('tables'):
+    grid = AgGrid(players[list("Pic".split(" "))+list("Player".split(" "))+all_stats+list("Similarity".split(" "))], 
+            gridOptions = grid_options,
+            allow_unsafe_jscode=True,
+            enable_enterprise_modules=False,
+            theme='material')
 
 sel_row = grid["selected_rows"]
     
 if sel_row:    
-    comp = get_comp_table(sel_row)
-    comp_percent = pd.DataFrame()
-    comp_percent.index=comp.index
-    comp_percent['Player'] = comp['Player']
-    
-    # list of percent of total stats between the 2 compared players
-    for i in all_stats:
-        if i not in ['Tm','Pos']:
-            percent_list = []
-            for row in comp.index:
-                percent_list.append(comp[i][row]/sum(comp[i]))
-            col_name = i
-            comp_percent[col_name] = percent_list
-    
-    # melting comp_percent and comp dataframes so each stat name and stat value are row items
-    comp_percent = comp_percent.reset_index()
-    comp_percent = comp_percent.melt(id_vars=['index','Player'],var_name='Stat',value_name='Value').set_index('index')    
-    comp = comp.reset_index()
-    comp = comp.drop(['Pos','Tm'],axis=1)
-    comp = comp.melt(id_vars=['index','Player'],var_name='Stat',value_name='Actual').set_index('index')
-    comp_percent.rename(columns = {'0':'Value'},inplace=True)
-    
-    # merging comp_percent and comp on comp_percent so the actual stat values are included in comp_percent
-    comp_percent = comp_percent.merge(comp,how='left')
+    # share of the two compared players' total and actual value of each selected stat
+    with perf.stage('comparison data'):
+        comp_id = get_id(sel_row[0]["Player"])
+        comp_percent = data_access.comparison(year, [player_id, comp_id], all_stats)
     
     # horizontal stacked bar chart to show relative proportion of selected stats between selected players
     bar = alt.Chart(comp_percent).mark_bar().encode(
@@ -297,9 +262,8 @@ if sel_row:
         )
     
     fig = (bar + rule)
-    st.altair_chart(fig, use_container_width=True)
-
-
-
-
+    with perf.stage('altair chart'):
+        st.altair_chart(fig, use_container_width=True)
 
+# show the timings of this rerun when enabled
+perf.finish_page()
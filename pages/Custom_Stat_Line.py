@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:00:04 2026
+
+Custom Stat Line Page
+
+@author: Josh Phelan
+"""
+
+import numpy as np
+from dataset import for_display
+import data_access
+from st_aggrid import AgGrid, JsCode
+from st_aggrid.grid_options_builder import GridOptionsBuilder
+from headshots import page_deadline
+from search import player_select
+import streamlit as st
+import perf
+
+# time the stages of each rerun when NBA_PERF is set or the page is opened with ?perf=1
+perf.start_page('Custom Stat Line')
+
+st.title('NBA Player Similarity')
+
+with st.sidebar:
+    col1, col2, col3 = st.columns([1,14,1])
+    with col1:
+        st.write("")
+    with col2:
+        st.image('raw_data/MJ.jpg',  use_column_width=True)
+    with col3:
+        st.write("")
+        
+    st.markdown(" ## NBA Player Similarity App")
+    st.markdown("This app calculates the similarity score between NBA players from the 1980 to 2016 seasons at 4 year intervals, and the 2021-2022 season. " + data_access.similarity_method() + " Data provided by [Basketball Reference](https://www.basketball-reference.com/).")
+    st.sidebar.info("See the code on my [Github](https://github.com/joshphelan/nba-player-similarity).", icon="🔗")
+    st.markdown('*Developed by Josh Phelan*')
+
+st.header('Most Similar Players To A Stat Line')
+
+st.write('''This page finds the 5 most similar NBA players to a stat line of your own, such as a player's
+         current season or a hypothetical player. Start from a player's stats or the league average,
+         set the stats you want to change and find the players most similar to the line. Starting
+         from a player compares every stat, starting from the league average compares only the
+         stats you set.''')
+
+# function that returns player id given player name
+def get_id(player_name):
+    player_id = name_index.id(player_name)
+    return player_id
+
+
+# List of years to select data from
+start = 1980
+end = 2017
+interval = 4
+
+years = ['All Years'] + [f'{year}' for year in np.arange(start, end, interval)] + ['2022']
+
+# button to choose the players the stat line is compared to
+year = st.selectbox("Compare to players from:", years, key = "line_year_box")
+
+# stats and artifacts shared by every session and page, loaded once per server process
+stats = data_access.stats(year)
+name_index = data_access.name_index(year)
+stat_lines = data_access.stat_lines(year)
+headshots = data_access.headshots()
+
+# the stats not set below are taken from a player's line or are the average of the players
+start_from = st.radio("Start from:", ['A player', 'League average'], horizontal=True)
+base = None
+base_id = 'average'
+if start_from == 'A player':
+    player = player_select("Choose player:", name_index, "line_player_box")
+    # stop here until the search matches a player
+    if player is None:
+        perf.finish_page()
+        st.stop()
+    base_id = get_id(player)
+    base = stats.loc[base_id]
+
+# stats to set, the rest of the line is left as it starts
+chosen = st.multiselect("Stats to set:", stat_lines.columns, ['PTS','TRB','AST','TS%'])
+start_line = stat_lines.line({}, base)
+
+# form so the line is only compared once every stat is set
+with st.form('stat_line'):
+    cols = st.columns(4)
+    line = {}
+    for n, stat in enumerate(chosen):
+        value = float(np.round(start_line[stat_lines.columns.index(stat)], 3))
+        # keyed by the starting line so choosing another player resets the inputs
+        line[stat] = cols[n % 4].number_input(stat, value=value, step=0.1, format='%.3f',
+                                              key='line_' + year + '_' + base_id + '_' + stat)
+    st.form_submit_button("Find Similar Players")
+
+# retrieve 5 most similar players to the stat line, other than the player it started from
+with perf.stage('stat line query'):
+    top5, d, s = stat_lines.nearest(line, 5, base, exclude=None if base is None else base_id)
+players = for_display(stats.loc[top5])
+st.subheader('Most Similar Players')
+# insert similarity score and format
+players.insert(1,"Similarity",s)
+players['Similarity'] = players['Similarity'].apply(lambda x: '{:.2%}'.format(float(x)))
+
+# Display similar players with pictures in AgGrid
+render_image = JsCode('''
+    class CellRenderer {
+        init(params) {
+            this.eGui = document.createElement('img');
+            this.eGui.setAttribute('src', params.value);
+            this.eGui.setAttribute('width', '25');
+            this.eGui.setAttribute('height', '35');
+        }
+        getGui() {
+            return this.eGui;
+        }
+    }
+''')
+
+# all headshots on the page share one deadline so a slow site cannot stall the rerun
+deadline = page_deadline()
+
+# create list of the headshots for most similar players from basketball reference
+# all years ids end with the season, which the headshots are not stored under
+with perf.stage('headshots'):
+    pics = headshots.resolve([idx[:-4] if year == 'All Years' else idx for idx in players.index], deadline)
+
+# insert headshots to players dataframe
+players.insert(0,"Pic",pics)
+
+# build GridOptions object for AgGrid table
+options_builder = GridOptionsBuilder.from_dataframe(players[list("Pic".split(" "))+list("Player".split(" "))+chosen+list("Similarity".split(" "))])
+options_builder.configure_column('Pic', cellRenderer = render_image,width =50, header_name= "")
+options_builder.configure_column('Player', width=165)
+options_builder.configure_column('Similarity', width=119)
+options_builder.configure_default_column(width=103)
+grid_options = options_builder.build()
+
+# display AgGrid table for most similar players
+with perf.stage('tables'):
+    AgGrid(players[list("Pic".split(" "))+list("Player".split(" "))+chosen+list("Similarity".split(" "))], 
+            gridOptions = grid_options,
+            allow_unsafe_jscode=True,
+            enable_enterprise_modules=False,
+            theme='material')
+
+# show the timings of this rerun when enabled
+perf.finish_page()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:40:12 2026
+
+Performance Instrumentation
+
+Times named stages of each rerun of a page and counts cache hits and misses.
+Timing is off unless NBA_PERF=1 is set or a page is opened with ?perf=1, and
+when it is off every stage is a shared no-op context.
+
+@author: Josh Phelan
+"""
+
+
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from functools import wraps
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+# time every rerun of every session, otherwise only sessions opened with ?perf=1
+ENABLED = os.environ.get('NBA_PERF', '') not in ('', '0')
+
+# file the timings of every timed rerun are appended to, one json object per line,
+# set NBA_PERF_LOG to an empty value to only send them to the logger
+LOG_PATH = os.environ.get('NBA_PERF_LOG', 'perf.jsonl')
+
+# each streamlit session reruns its page in its own thread
+_local = threading.local()
+_log_lock = threading.Lock()
+_NULL = nullcontext()
+
+
+class Run:
+    # time and calls of each named stage of one rerun of a page, and the misses of the
+    # stages that are cached functions. A stage's time is its self time, without the
+    # stages nested in it, so the stages add up to at most the rerun's total, and its
+    # inclusive time is kept beside it
+    def __init__(self, page):
+        self.page = page
+        self.start = perf_counter()
+        self.total = None
+        self.stages = {}
+        self.cached = set()
+        self.misses = Counter()
+        # [name, seconds of the stages nested in it so far] of each open stage
+        self.stack = []
+
+    def add(self, name, seconds, inclusive):
+        stage = self.stages.setdefault(name, [0.0, 0.0, 0])
+        stage[0] += seconds
+        stage[1] += inclusive
+        stage[2] += 1
+
+    # the rerun as a json serializable dict
+    def record(self):
+        stages = []
+        for name, (seconds, inclusive, calls) in self.stages.items():
+            stage = {'name': name, 'ms': round(seconds * 1000, 3),
+                     'inclusive_ms': round(inclusive * 1000, 3), 'calls': calls}
+            if name in self.cached:
+                stage['hits'] = calls - self.misses[name]
+                stage['misses'] = self.misses[name]
+            stages.append(stage)
+        return {'page': self.page, 'time': datetime.now().isoformat(timespec='seconds'),
+                'total_ms': None if self.total is None else round(self.total * 1000, 3),
+                'stages': stages}
+
+# function to return the rerun being timed in this thread, None when timing is off
+def current():
+    return getattr(_local, 'run', None)
+
+# function to start timing a rerun of a page, returns the run or None when timing is off
+def start(page, enabled=None):
+    _local.run = Run(page) if (ENABLED if enabled is None else enabled) else None
+    return _local.run
+
+@contextmanager
+def _timing(run, name):
+    frame = [name, 0.0]
+    run.stack.append(frame)
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = perf_counter() - start
+        run.stack.pop()
+        # the enclosing stage's self time leaves this stage out
+        if run.stack:
+            run.stack[-1][1] += elapsed
+        run.add(name, elapsed - frame[1], elapsed)
+
+# context manager that adds the time of its block to the named stage, less the time of
+# the stages nested in it
+def stage(name):
+    run = current()
+    return _NULL if run is None else _timing(run, name)
+
+# decorator that times every call of a function as a stage named after the function
+def timed(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with stage(fn.__name__):
+            return fn(*args, **kwargs)
+    return wrapper
+
+# decorator for a cached function that times every call, the cached body calls miss()
+# so the calls that did not hit the cache are counted
+def cached(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        run = current()
+        if run is not None:
+            run.cached.add(fn.__name__)
+        with stage(fn.__name__):
+            return fn(*args, **kwargs)
+    return wrapper
+
+# records a cache miss for the innermost stage, call it first thing in a cached function
+def miss():
+    run = current()
+    if run is not None and run.stack:
+        run.misses[run.stack[-1][0]] += 1
+
+# function to stop timing the current rerun and write it to the structured log,
+# returns the finished run or None when timing is off
+def finish():
+    run = current()
+    if run is None:
+        return None
+    _local.run = None
+    run.total = perf_counter() - run.start
+
+    line = json.dumps(run.record())
+    logger.info(line)
+    if LOG_PATH:
+        with _log_lock, open(LOG_PATH, 'a') as f:
+            f.write(line + '\n')
+    return run
+
+
+# function to start timing a streamlit page when NBA_PERF is set or the page was opened
+# with ?perf=1, call it before anything else on the page
+def start_page(page):
+    import streamlit as st
+
+    param = st.experimental_get_query_params().get('perf', ['0'])[0]
+    return start(page, ENABLED or param not in ('', '0'))
+
+# function to finish timing a streamlit page and show the rerun's breakdown in the sidebar,
+# call it at the end of the page and before every st.stop()
+def finish_page():
+    import streamlit as st
+    import pandas as pd
+
+    run = finish()
+    if run is None:
+        return
+    record = run.record()
+    with st.sidebar.expander('Performance', expanded=True):
+        st.caption(f"Last rerun of {record['page']}: {record['total_ms']:.1f} ms")
+        st.caption('ms is the time of a stage less the stages nested in it, with them it is '
+                   'the inclusive ms')
+        table = pd.DataFrame(record['stages']).rename(columns={
+            'name': 'Stage', 'inclusive_ms': 'inclusive ms', 'calls': 'Calls', 'hits': 'Hits',
+            'misses': 'Misses'})
+        st.dataframe(table, hide_index=True, use_container_width=True)
@@ -0,0 +1,512 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:06:17 2026
+
+Data Pipeline
+
+Build steps for the combined stats and distance artifacts, and an incremental
+rebuild that only reruns the steps whose inputs, parameters or code changed.
+Independent seasons are built in parallel on a process pool.
+Run from the repository root with python pipeline.py
+
+@author: Josh Phelan
+"""
+
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import traceback
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+import numpy as np
+from clean import clean
+from preprocess import feature_columns, standardize, fit_projection, metric_space
+from distance import (pairwise_distances, top_k, tiled_top_k, distance_stats, quantize_scale, quantize,
+                      dequantize)
+from metrics import METRICS
+from neighbors import NeighborIndex
+from dataset import season_path, write_season, read_stats, for_display
+from artifacts import (ARTIFACT_DIR, artifact_name, save_features, save_scaler, save_metric, save_projection,
+                       save_distances, open_distances, save_quantization, save_neighbors, save_stats)
+from loader import file_hash, temp_file, write_manifest
+
+# seasons in the dataset, 1980 to 2016 at 4 year intervals and 2022
+start = 1980
+end = 2017
+interval = 4
+
+YEARS = [f'{year}' for year in np.arange(start, end, interval)] + ['2022']
+
+# default build parameters, see build_artifacts
+PARAMS = {'dtype': 'float64', 'k': 50, 'full_matrix': False, 'block_size': 1024, 'csv': False,
+          'metric': 'euclidean', 'variance': None, 'max_error': 0.005, 'min_top5': 0.95}
+
+# distance matrix dtypes stored quantized, scaled so the max distance is the dtype's max
+QUANTIZED = ['uint16', 'uint8']
+
+BUILD_MANIFEST = 'data/build_manifest.json'
+
+# function to return the path of the combined stats csv export for a year or 'All Years'
+def stats_path(year):
+    return 'data/NBA ' + year + ' Combined Stats.csv'
+
+# function to return the raw basketball reference tables for a year
+def raw_paths(year):
+    return ['raw_data/NBA ' + year + ' Per Game.csv', 'raw_data/NBA ' + year + ' Advanced.csv']
+
+# function to write a dataframe to a temp file next to path and rename it into place,
+# so a crash never leaves a half written csv behind
+def write_csv(df, path):
+    fd, tmp = temp_file(path)
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            df.to_csv(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+# function to write a json file through a temp file and rename
+def write_json(obj, path):
+    fd, tmp = temp_file(path)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(obj, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+# cleans the raw tables for a year and saves the combined stats to the season's partition
+# of the stats dataset, csv=True also exports them as csv
+def build_season_stats(year, csv=False):
+    stats = clean(year)
+    write_season(stats, year)
+    if csv:
+        write_csv(stats, stats_path(year))
+
+# exports the combined stats of every season as one csv, ids and names suffixed with the season
+def export_all_years_csv(years=YEARS):
+    write_csv(for_display(read_stats('All Years', seasons=years)), stats_path('All Years'))
+
+# builds the features, distance matrix, top k neighbors and distance statistics for a year
+# dtype sets the precision of the distance matrix, k the neighbors stored per player and
+# a dtype in QUANTIZED stores the matrix and the neighbor table distances quantized, checked
+# to be within max_error of the max distance and, for the matrix, to keep the full precision
+# top 5 of at least min_top5 of the players, and prints the error, the top 5 overlap with full
+# precision and size reduction
+# full_matrix=True also saves the n x n matrix, which only the benchmarks read, the app and
+# service answer from the features and neighbor table, and metric is the name of a registered metric
+# the neighbors and distances are computed with, see metrics.py
+# variance, e.g. 0.95, projects the standardized features onto the fewest PCA components
+# explaining that share of their variance and runs every distance in the reduced space
+# block_size builds in tiles of block_size x block_size distances so memory stays bounded,
+# writing the matrix to a memory mapped file, None builds the whole matrix in memory and
+# takes the neighbors from the KD-tree when full_matrix is False
+# the files are written to a temp folder that replaces the year's folder once complete, see
+# _replace_dir
+def build_artifacts(year, dtype='float64', k=50, full_matrix=False, block_size=None,
+                    metric='euclidean', variance=None, max_error=0.005, min_top5=0.95,
+                    artifact_dir=ARTIFACT_DIR):
+    os.makedirs(artifact_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.build-', dir=artifact_dir)
+    try:
+        if block_size:
+            _write_tiled_artifacts(year, dtype, k, full_matrix, block_size, metric, variance,
+                                   max_error, min_top5, tmp_dir)
+        else:
+            _write_artifacts(year, dtype, k, full_matrix, metric, variance, max_error, min_top5,
+                             tmp_dir)
+        _replace_dir(os.path.join(tmp_dir, artifact_name(year)),
+                     os.path.join(artifact_dir, artifact_name(year)))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+# function to standardize a year's stats, fit the optional projection and the metric, and save
+# the standardized features with the scaler, projection and metric, returns the ids and the
+# features in the metric's space, where euclidean distances are the metric's distances
+def _write_features(year, metric, variance, artifact_dir):
+    stats = read_stats(year)
+    scaled_data, scaler = standardize(stats)
+
+    # Save standardized features for the nearest neighbor query engine, and the scaler and
+    # column order that standardize stat lines which are not in the dataset
+    save_features(year, stats.index, scaled_data, artifact_dir)
+    save_scaler(year, feature_columns(stats.columns), scaler.mean_, scaler.scale_, artifact_dir)
+
+    projection = None
+    if variance:
+        projection, explained = fit_projection(scaled_data, variance)
+        save_projection(year, projection, explained, artifact_dir)
+
+    x, fitted = metric_space(scaled_data, metric, projection)
+    save_metric(year, metric, fitted, artifact_dir)
+    return stats.index, x
+
+# function to check a distance matrix stored quantized against full precision distances one
+# block of rows at a time. Raises a ValueError when a stored distance is further than max_error
+# times the max distance from the exact distance. Compares each player's top 5 from the stored
+# distances with the full precision top 5 as sets of ids, a different set only counts as kept
+# when the players swapped in and out are at exactly the same full precision distances, and
+# raises a ValueError when the top 5 of less than min_top5 of the players is kept
+# Prints the error, the share of players whose top 5 is kept, the overlap and the size reduction
+def _check_quantized(year, x, stored, scale, indices, max_d, max_error, min_top5, block_size=1024):
+    n = len(x)
+    top = min(5, indices.shape[1])
+    error = 0.0
+    kept = 0
+    shared = 0
+    for start in range(0, n, block_size):
+        rows = np.arange(start, min(start + block_size, n))
+        diagonal = (np.arange(len(rows)), rows)
+        d = dequantize(stored[start:start + len(rows)], scale)
+        exact_d = pairwise_distances(x[rows], x)
+        exact_d[diagonal] = 0
+        error = max(error, float(np.abs(d - exact_d).max()))
+
+        # a player is never its own neighbor
+        d[diagonal] = np.inf
+        exact_d[diagonal] = np.inf
+        expected = indices[rows, :top]
+        ranked = np.argsort(d, axis=1, kind='stable')[:, :top]
+        same = (np.sort(ranked, axis=1) == np.sort(expected, axis=1)).all(axis=1)
+        tied = (np.sort(np.take_along_axis(exact_d, ranked, axis=1), axis=1)
+                == np.sort(np.take_along_axis(exact_d, expected, axis=1), axis=1)).all(axis=1)
+        kept += int(np.count_nonzero(same | tied))
+        shared += int(np.count_nonzero((ranked[:, :, None] == expected[:, None, :]).any(axis=2)))
+
+    if error > max_error * max_d:
+        raise ValueError(f'{year}: quantization error {error:.3g} is above {max_error} of the '
+                         f'max distance {max_d:.3g}')
+    if kept < min_top5 * n:
+        raise ValueError(f'{year}: quantized distances keep the top {top} of {kept / n:.1%} of '
+                         f'players, below {min_top5:.1%}')
+    full_mb = n * n * 8 / 2 ** 20
+    stored_mb = stored.nbytes / 2 ** 20
+    print(f'{year}: distances stored as {stored.dtype}, {stored_mb:.1f} MB instead of {full_mb:.1f} MB '
+          f'as float64 ({full_mb / stored_mb:.0f}x smaller), max error {error:.2e} '
+          f'({error / max_d:.2e} of the max distance), top {top} kept for {kept / n:.1%} of players '
+          f'and {shared / (n * top):.1%} of top {top} neighbors shared with full precision')
+    return error
+
+# function to quantize the distances of the neighbor table the app and service read, the
+# neighbors keep their full precision order so only the distances carry the rounding
+# Raises a ValueError when a distance is further than max_error times the max distance from
+# the exact distance, prints the size reduction and returns the quantized distances and error
+def _quantize_neighbors(year, neighbor_d, scale, dtype, max_d, max_error):
+    stored = quantize(neighbor_d, scale, dtype)
+    error = float(np.abs(dequantize(stored, scale) - neighbor_d).max()) if stored.size else 0.0
+    if error > max_error * max_d:
+        raise ValueError(f'{year}: neighbor distance quantization error {error:.3g} is above '
+                         f'{max_error} of the max distance {max_d:.3g}')
+    full_kb = stored.size * 8 / 2 ** 10
+    print(f'{year}: neighbor distances stored as {stored.dtype}, {stored.nbytes / 2 ** 10:.0f} KB '
+          f'instead of {full_kb:.0f} KB as float64, max error {error / max_d:.2e} of the max distance')
+    return stored, error
+
+def _write_artifacts(year, dtype, k, full_matrix, metric, variance, max_error, min_top5,
+                     artifact_dir):
+    ids, x = _write_features(year, metric, variance, artifact_dir)
+
+    # Save max, mean and per player distance percentiles so the app never scans distances
+    max_d, mean_d, quantiles = distance_stats(x)
+    save_stats(year, max_d, mean_d, quantiles, artifact_dir)
+
+    quantized = dtype in QUANTIZED
+    scale = quantize_scale(max_d, dtype) if quantized else None
+    error = 0.0
+    if full_matrix:
+        distances = pairwise_distances(x, dtype=np.float64 if quantized else np.dtype(dtype))
+        indices, neighbor_d = top_k(distances, k)
+        if quantized:
+            distances = quantize(distances, scale, dtype)
+            error = _check_quantized(year, x, distances, scale, indices, max_d, max_error, min_top5)
+        # Save distance matrix and player id order to data/artifacts
+        save_distances(year, ids, distances, artifact_dir)
+    else:
+        indices, neighbor_d = NeighborIndex(ids, x).top_k(k)
+
+    if quantized:
+        neighbor_d, neighbor_error = _quantize_neighbors(year, neighbor_d, scale, dtype, max_d,
+                                                         max_error)
+        save_quantization(year, scale, max(error, neighbor_error), artifact_dir)
+
+    # Save top k neighbor table so the app does not sort a full row per lookup
+    save_neighbors(year, indices, neighbor_d, artifact_dir)
+
+def _write_tiled_artifacts(year, dtype, k, full_matrix, block_size, metric, variance, max_error,
+                           min_top5, artifact_dir):
+    ids, x = _write_features(year, metric, variance, artifact_dir)
+    n = len(ids)
+
+    # peak memory of the tiles, the memory mapped matrix is paged out to disk as it is written
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = perf_counter()
+
+    # Save max, mean and per player distance percentiles, in row blocks holding
+    # no more distances than one tile
+    max_d, mean_d, quantiles = distance_stats(x, block_size=max(block_size ** 2 // n, 1))
+    save_stats(year, max_d, mean_d, quantiles, artifact_dir)
+
+    # Save each tile of the distance matrix as it is computed, with the player id order
+    # quantized distances are computed in float64 and quantized against the max distance
+    quantized = dtype in QUANTIZED
+    scale = quantize_scale(max_d, dtype) if quantized else None
+    out = open_distances(year, ids, dtype, artifact_dir) if full_matrix else None
+    indices, neighbor_d = tiled_top_k(x, k, block_size, np.float64 if quantized else np.dtype(dtype),
+                                      out, scale)
+    if quantized:
+        error = 0.0
+        if full_matrix:
+            error = _check_quantized(year, x, out, scale, indices, max_d, max_error, min_top5,
+                                     max(block_size ** 2 // n, 1))
+        neighbor_d, neighbor_error = _quantize_neighbors(year, neighbor_d, scale, dtype, max_d,
+                                                         max_error)
+        save_quantization(year, scale, max(error, neighbor_error), artifact_dir)
+    del out
+
+    # Save top k neighbor table so the app does not sort a full row per lookup
+    save_neighbors(year, indices, neighbor_d, artifact_dir)
+
+    seconds = perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    if not tracing:
+        tracemalloc.stop()
+    print(f'{year}: {n} rows in {seconds:.2f} s, {n / seconds:.0f} rows/s, '
+          f'peak memory {peak / 2 ** 20:.1f} MB')
+
+# function to swap a finished folder into place, the old folder is only removed once the new one is in
+# the swap is two renames rather than one atomic step, a crash or reader between them finds no
+# folder at dst, the old one is left at dst.old-<pid>, but never a mix of old and new files
+def _replace_dir(src, dst):
+    old = None
+    if os.path.exists(dst):
+        old = dst + '.old-' + str(os.getpid())
+        os.rename(dst, old)
+    os.rename(src, dst)
+    if old is not None:
+        shutil.rmtree(old)
+
+# function to run a build step in a worker, returns its run time and the traceback if it failed
+def _timed(fn, args, kwargs):
+    start = perf_counter()
+    try:
+        fn(*args, **kwargs)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    return perf_counter() - start, error
+
+# function to run independent tasks of (name, fn, args, kwargs) on a pool of worker processes,
+# returns a dict of task name to (seconds, error), error is None for the tasks that succeeded
+def run_parallel(tasks, workers=None):
+    if workers == 1 or len(tasks) <= 1:
+        return {name: _timed(fn, args, kwargs) for name, fn, args, kwargs in tasks}
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {name: pool.submit(_timed, fn, args, kwargs)
+                   for name, fn, args, kwargs in tasks}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception:
+                # the worker process itself died, e.g. killed for running out of memory
+                results[name] = (float('nan'), traceback.format_exc())
+    return results
+
+# function to print the run time of every task and the traceback of every failed task
+def print_report(results):
+    for name, (seconds, error) in results.items():
+        print(f'{name:<20} {seconds:8.2f} s  ' + ('FAILED' if error else 'ok'))
+    for name, (seconds, error) in results.items():
+        if error:
+            print('\n' + name + ' failed:\n' + error)
+
+
+class Target:
+    # a derived artifact, rebuilt by calling fn(*args, **params) when the hashes of its
+    # inputs, the source of the modules in code or its params differ from the last build
+    # targets in the same stage do not read each other's outputs and are built in parallel
+    def __init__(self, name, stage, fn, args, inputs, outputs, code, params=None):
+        self.name = name
+        self.stage = stage
+        self.fn = fn
+        self.args = args
+        self.inputs = inputs
+        self.outputs = outputs
+        self.code = code
+        self.params = params or {}
+
+    # (name, fn, args, kwargs) task for run_parallel
+    def task(self):
+        return self.name, self.fn, self.args, self.params
+
+    # files the target wrote, a directory output stands for every file inside it
+    def output_files(self):
+        files = []
+        for path in self.outputs:
+            if os.path.isdir(path):
+                files += sorted(os.path.join(root, name).replace(os.sep, '/')
+                                for root, dirs, names in os.walk(path) for name in names
+                                if not name.endswith('.verified'))
+            elif os.path.exists(path):
+                files.append(path)
+        return files
+
+    # hashes of everything that decides the target's content
+    def signature(self):
+        return {'inputs': {path: file_hash(path) if os.path.exists(path) else None
+                           for path in self.inputs},
+                'code': {path: file_hash(path) for path in self.code},
+                'params': self.params}
+
+# function to return every build target in dependency order
+def targets(years=YEARS, params=PARAMS):
+    # the modules each step runs, pipeline.py holds the build steps and loader.py writes
+    # the files through temp files and resolves the artifact directory
+    clean_code = ['pipeline.py', 'clean.py', 'dataset.py', 'loader.py']
+    artifact_code = ['pipeline.py', 'preprocess.py', 'metrics.py', 'distance.py', 'neighbors.py',
+                     'artifacts.py', 'dataset.py', 'loader.py']
+    artifact_params = {'dtype': params['dtype'], 'k': params['k'],
+                       'block_size': params['block_size'], 'metric': params['metric'],
+                       'variance': params['variance'], 'max_error': params['max_error'],
+                       'min_top5': params['min_top5'], 'full_matrix': params['full_matrix']}
+    csv = params['csv']
+
+    steps = [Target('stats ' + year, 0, build_season_stats, (year,),
+                    raw_paths(year), [season_path(year)] + ([stats_path(year)] if csv else []),
+                    clean_code, {'csv': csv})
+             for year in years]
+    if csv:
+        steps.append(Target('csv All Years', 1, export_all_years_csv, (),
+                            [season_path(year) for year in years], [stats_path('All Years')],
+                            ['pipeline.py', 'dataset.py', 'loader.py'], {'years': list(years)}))
+    steps += [Target('artifacts ' + year, 1, build_artifacts, (year,),
+                     [season_path(year)], [os.path.join(ARTIFACT_DIR, artifact_name(year))],
+                     artifact_code, artifact_params)
+              for year in years]
+    steps.append(Target('artifacts All Years', 1, build_artifacts, ('All Years',),
+                        [season_path(year) for year in years],
+                        [os.path.join(ARTIFACT_DIR, artifact_name('All Years'))],
+                        artifact_code, artifact_params))
+    return steps
+
+# function to read the build manifest of the last build of every target
+def load_build_manifest(path=BUILD_MANIFEST):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+# function to check whether a target's last recorded build still matches
+def is_fresh(target, record, signature):
+    if record is None or record['signature'] != signature:
+        return False
+    outputs = record['outputs']
+    return (bool(outputs) and target.output_files() == sorted(outputs)
+            and all(file_hash(path) == sha for path, sha in outputs.items()))
+
+# rebuilds the stale targets stage by stage on a pool of worker processes and records
+# the ones that succeeded in the build manifest, targets reading the output of a failed
+# target are blocked, returns a dict of target name to (seconds, error) for every target
+# that was run and the names of the targets that were skipped and blocked
+def rebuild(steps=None, force=False, dry_run=False, workers=None, manifest_path=BUILD_MANIFEST):
+    steps = targets() if steps is None else steps
+    manifest = load_build_manifest(manifest_path)
+    results, skipped, blocked = {}, [], []
+    # outputs a dry run would have rewritten and outputs of failed targets
+    pending, failed = set(), set()
+
+    for stage in sorted({target.stage for target in steps}):
+        stale = []
+        for target in [target for target in steps if target.stage == stage]:
+            if not failed.isdisjoint(target.inputs):
+                blocked.append(target.name)
+                failed.update(target.outputs)
+                continue
+            # inputs written by an earlier stage are hashed after that stage ran
+            signature = target.signature()
+            if (not force and pending.isdisjoint(target.inputs)
+                    and is_fresh(target, manifest.get(target.name), signature)):
+                skipped.append(target.name)
+                continue
+            stale.append((target, signature))
+
+        if dry_run:
+            for target, signature in stale:
+                results[target.name] = (0.0, None)
+                pending.update(target.outputs)
+            continue
+        if not stale:
+            continue
+
+        print('Building', ', '.join(target.name for target, signature in stale))
+        stage_results = run_parallel([target.task() for target, signature in stale], workers)
+        results.update(stage_results)
+
+        for target, signature in stale:
+            if stage_results[target.name][1] is not None:
+                failed.update(target.outputs)
+                continue
+            manifest[target.name] = {'signature': signature,
+                                     'outputs': {path: file_hash(path)
+                                                 for path in target.output_files()}}
+        # record progress after every stage so an interrupted rebuild resumes
+        write_json(manifest, manifest_path)
+
+    if not dry_run and any(name.startswith('artifacts') and error is None
+                           for name, (seconds, error) in results.items()):
+        # Record the hash of every artifact so the app can verify what it loads
+        write_manifest()
+
+    return results, skipped, blocked
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild stale combined stats and distance artifacts.')
+    parser.add_argument('--force', action='store_true', help='rebuild every target')
+    parser.add_argument('--dry-run', action='store_true', help='only report what would be rebuilt')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='worker processes, defaults to the number of cpus')
+    parser.add_argument('--dtype', default=PARAMS['dtype'], choices=['float32', 'float64'] + QUANTIZED,
+                        help='precision of the distance matrices, uint16 and uint8 store them quantized')
+    parser.add_argument('-k', type=int, default=PARAMS['k'], help='neighbors stored per player')
+    parser.add_argument('--block-size', type=int, default=PARAMS['block_size'],
+                        help='rows and columns per tile of distances, 0 builds each matrix in memory')
+    parser.add_argument('--csv', action='store_true',
+                        help='also export the combined stats as csv')
+    parser.add_argument('--full-matrix', action='store_true',
+                        help='also save the n x n distance matrices the benchmarks read')
+    parser.add_argument('--metric', default=PARAMS['metric'], choices=list(METRICS),
+                        help='distance the players are compared with')
+    parser.add_argument('--variance', type=float, default=PARAMS['variance'],
+                        help='project onto the PCA components explaining this share of the '
+                             'variance, e.g. 0.95, before computing distances')
+    parser.add_argument('--max-error', type=float, default=PARAMS['max_error'],
+                        help='largest quantization error allowed, as a share of the max distance')
+    parser.add_argument('--min-top5', type=float, default=PARAMS['min_top5'],
+                        help='smallest share of players whose full precision top 5 a quantized '
+                             'matrix must keep')
+    args = parser.parse_args()
+
+    params = {'dtype': args.dtype, 'k': args.k, 'full_matrix': args.full_matrix,
+              'block_size': args.block_size or None, 'csv': args.csv, 'metric': args.metric,
+              'variance': args.variance, 'max_error': args.max_error, 'min_top5': args.min_top5}
+    results, skipped, blocked = rebuild(targets(params=params), force=args.force,
+                                        dry_run=args.dry_run, workers=args.workers)
+
+    if args.dry_run:
+        print('Would rebuild', len(results), 'targets:', ', '.join(results) or '-')
+    else:
+        print_report(results)
+    print('Skipped', len(skipped), 'up to date targets:', ', '.join(skipped) or '-')
+    if blocked:
+        print('Blocked', len(blocked), 'targets by failed dependencies:', ', '.join(blocked))
+
+    failures = [name for name, (seconds, error) in results.items() if error]
+    if failures or blocked:
+        raise SystemExit(1)
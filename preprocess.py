@@ -8,15 +8,27 @@ Data Preprocessing Function
 """
 
 
-import pandas as pd
+import numpy as np
+from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
-from scipy.spatial.distance import euclidean
+from distance import pairwise_distances
+from dataset import read_stats
+from metrics import get_metric
 
-def preprocess(year):
+# columns of the combined stats that are not standardized into features
+NON_FEATURES = ['Player', 'Pos', 'Tm']
 
-    stats = pd.read_csv('data/NBA ' + year +' Combined Stats.csv',index_col=('ID'))
-    
-    stats_num = stats.drop(['Player','Pos','Tm'],axis=1)
+# function to return the feature columns among the combined stats columns, in the order
+# of the columns of the feature matrix
+def feature_columns(columns):
+    return [col for col in columns if col not in NON_FEATURES]
+
+# function to standardize the feature columns of the combined stats, returns the standardized
+# features and the fitted scaler, whose mean_ and scale_ standardize new stat lines the same way
+def standardize(stats):
+
+    # stats are stored as float32, scale in float64 so distances keep full precision
+    stats_num = stats[feature_columns(stats.columns)].astype(np.float64)
         
     # Normalize data based on standard scaler so all columns are considered evenly
     scaler = StandardScaler()
@@ -24,21 +36,46 @@ def preprocess(year):
     scaler.fit(stats_num)
     
     scaled_data = scaler.transform(stats_num)
+
+    return scaled_data, scaler
+
+# function to read the combined stats for a year and standardize the numeric columns
+def scale(year):
+
+    stats = read_stats(year)
+    scaled_data = standardize(stats)[0]
+
+    return stats, scaled_data
+
+# function to fit a PCA projection of the standardized features keeping the fewest components
+# that explain at least the variance target, e.g. 0.95, the features are already centered so
+# projecting is a single matrix product. Returns the features x components projection matrix
+# and the share of the variance the components explain
+def fit_projection(scaled_data, variance=0.95):
+    pca = PCA(n_components=variance, svd_solver='full').fit(scaled_data)
+    return pca.components_.T, float(pca.explained_variance_ratio_.sum())
+
+# function to fit a metric to standardized features, returns the features in the metric's
+# space, where euclidean distances are the metric's distances, and the fitted transform
+# a projection from fit_projection is applied first so the metric is fitted in the reduced space
+def metric_space(scaled_data, metric='euclidean', projection=None):
+    if projection is not None:
+        scaled_data = scaled_data @ projection
+    metric = get_metric(metric)
+    fitted = metric.fit(scaled_data)
+    return metric.transform(scaled_data, fitted), fitted
+
+# function to return the player ids, the features in the metric's space and the distance
+# matrix between them, the euclidean distances of those features, the matrix is skipped
+# when full_matrix is False
+# variance projects the features onto the PCA components explaining that share of the variance
+def preprocess(year, dtype=np.float64, full_matrix=True, metric='euclidean', variance=None):
+
+    stats, scaled_data = scale(year)
+    projection = fit_projection(scaled_data, variance)[0] if variance else None
     
-    # Creating dictionary of distance scores for each player in dataset
-    dist_dict = {}
-    for j in range(len(stats)):    
-        # similar to player j by euclidean distance with scaled data
-        sim_j = pd.DataFrame(columns=['Distance'])
-        k = stats.index[j]
-        for i in range(len(scaled_data)):
-            # set index of sim_j to player that is being measured against
-            q = stats.index[i]
-            if i != j:
-                sim_j.loc[q] = euclidean(scaled_data[j], scaled_data[i])
-            else:
-                continue
-        dist_dict[k] = sim_j
-
-    return dist_dict
-    
\ No newline at end of file
+    # distance between every pair of players in one pass, as euclidean distance in the metric's space
+    x = metric_space(scaled_data, metric, projection)[0]
+    distances = pairwise_distances(x, dtype=dtype) if full_matrix else None
+
+    return stats.index, x, distances
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:57:05 2026
+
+Artifact Residency
+
+Keeps a bounded set of loaded resources in memory, e.g. the stats and
+artifacts of the seasons users are looking at. Resources are evicted least
+recently used first once there are more than an entry budget of them or they
+hold more than a memory budget, and can be prefetched on a background thread
+before they are asked for. Concurrent requests for a resource that is loading
+wait for the one load rather than loading it again.
+
+@author: Josh Phelan
+"""
+
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class Residency:
+    # resources by key, loaded with load(key) on a miss and evicted least recently used first
+    # beyond max_entries resources or max_bytes of their nbytes, None leaves a budget unlimited
+    # the most recently used resource is always kept, so one resource may exceed max_bytes
+    def __init__(self, load, max_entries=None, max_bytes=None, prefetch_workers=1):
+        self.load = load
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.evictions = 0
+        self.prefetches = 0
+        self.nbytes = 0
+        self._resident = OrderedDict()
+        self._sizes = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(prefetch_workers, thread_name_prefix='prefetch')
+
+    def __len__(self):
+        return len(self._resident)
+
+    def __contains__(self, key):
+        return key in self._resident
+
+    # function to return the resource of a key, loading it on a miss or waiting for the
+    # load already running for it, e.g. a prefetch, which counts as a wait rather than a miss
+    def get(self, key):
+        with self._lock:
+            if key in self._resident:
+                self._resident.move_to_end(key)
+                self.hits += 1
+                return self._resident[key]
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = self._loading[key] = Future()
+            else:
+                self.waits += 1
+        if owner:
+            self._load(key, future)
+        return future.result()
+
+    # function to load the resources of keys that are neither resident nor loading on the
+    # background thread, each is added just behind the most recently used resource so it
+    # never evicts the resource that is in use
+    def prefetch(self, keys):
+        for key in keys:
+            with self._lock:
+                if key in self._resident or key in self._loading:
+                    continue
+                future = self._loading[key] = Future()
+                self.prefetches += 1
+            self._pool.submit(self._load, key, future, True)
+
+    def _load(self, key, future, prefetched=False):
+        try:
+            resource = self.load(key)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            if prefetched:
+                logger.warning('Could not prefetch %s', key, exc_info=True)
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            del self._loading[key]
+            in_use = next(reversed(self._resident), None) if prefetched else None
+            self._resident[key] = resource
+            self._sizes[key] = resource.nbytes
+            self.nbytes += resource.nbytes
+            if in_use is not None:
+                self._resident.move_to_end(in_use)
+            self._evict()
+        future.set_result(resource)
+
+    # evicts least recently used resources until both budgets are met, always keeping the
+    # most recently used one
+    def _evict(self):
+        while len(self._resident) > 1 and (
+                (self.max_entries is not None and len(self._resident) > self.max_entries)
+                or (self.max_bytes is not None and self.nbytes > self.max_bytes)):
+            key, resource = self._resident.popitem(last=False)
+            self.nbytes -= self._sizes.pop(key)
+            self.evictions += 1
+            logger.debug('Evicted %s', key)
+
+    # counts of the residency, the resident resources and bytes, and the hits, misses, waits
+    # for a load already running, evictions and prefetches since the start
+    def info(self):
+        with self._lock:
+            return {'resident': len(self._resident), 'nbytes': self.nbytes, 'hits': self.hits,
+                    'misses': self.misses, 'waits': self.waits, 'evictions': self.evictions,
+                    'prefetches': self.prefetches}
+
+    def clear(self):
+        with self._lock:
+            self._resident.clear()
+            self._sizes.clear()
+            self.nbytes = 0
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:03:51 2026
+
+Player Name Index and Search
+
+@author: Josh Phelan
+"""
+
+
+import re
+import sys
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+
+# number of candidates shown per page of search results
+PAGE_SIZE = 20
+
+# function to lowercase a name and strip accents and punctuation so 'Dončić' matches 'doncic'
+def normalize(name):
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^a-z0-9 ]', ' ', name.lower()).split())
+
+# function to return the three letter substrings of a normalized name, padded at word edges
+def trigrams(text):
+    padded = '  ' + text + ' '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# function to return the end of the range of keys that start with a prefix
+def _prefix_end(keys, prefix):
+    return bisect_left(keys, prefix + '\uffff')
+
+
+class NameIndex:
+    # hash index from player name to id, and a prefix and trigram index over
+    # normalized names for search as you type
+    def __init__(self, stats):
+        self.names = list(stats['Player'])
+        self._ids = {}
+        for name, player_id in zip(self.names, stats.index):
+            # keep the first player with a name, the same one the old boolean scan returned
+            self._ids.setdefault(name, player_id)
+
+        normalized = [normalize(name) for name in self.names]
+
+        # every word boundary of every name, sorted, so 'jam' finds 'LeBron James'
+        starts = sorted((text[m.start():], pos) for pos, text in enumerate(normalized)
+                        for m in re.finditer(r'\b\w', text))
+        self._keys = [key for key, pos in starts]
+        self._positions = [pos for key, pos in starts]
+
+        self._trigrams = {}
+        for pos, text in enumerate(normalized):
+            for gram in trigrams(text):
+                self._trigrams.setdefault(gram, []).append(pos)
+
+    def __len__(self):
+        return len(self.names)
+
+    # approximate bytes held by the index, its lists, dicts and the strings only it holds
+    @property
+    def nbytes(self):
+        containers = [self.names, self._ids, self._keys, self._positions, self._trigrams]
+        return (sum(sys.getsizeof(c) for c in containers)
+                + sum(sys.getsizeof(key) for key in self._keys)
+                + sum(sys.getsizeof(positions) for positions in self._trigrams.values()))
+
+    # player id for a player name
+    def id(self, player_name):
+        return self._ids[player_name]
+
+    # first limit positions of names with a word starting with the query, in alphabetical
+    # order of the matching word, only reads as many keys as it needs, None reads them all
+    def _prefix_matches(self, query, limit=None):
+        positions = []
+        seen = set()
+        for i in range(bisect_left(self._keys, query), _prefix_end(self._keys, query)):
+            pos = self._positions[i]
+            if pos not in seen:
+                seen.add(pos)
+                positions.append(pos)
+                if len(positions) == limit:
+                    break
+        return positions
+
+    # positions of names sharing at least half of the query's trigrams, best first
+    def _fuzzy_matches(self, query, min_share=0.5):
+        grams = trigrams(query)
+        counts = Counter(pos for gram in grams for pos in self._trigrams.get(gram, ()))
+        needed = min_share * len(grams)
+        return [pos for pos, count in counts.most_common() if count >= needed]
+
+    # up to limit player names matching the query, starting at offset
+    # prefix matches come first, then misspellings found by trigram overlap
+    def search(self, query, limit=PAGE_SIZE, offset=0):
+        query = normalize(query)
+        if not query:
+            return self.names[offset:offset + limit]
+
+        end = offset + limit
+        positions = self._prefix_matches(query, end)
+        if len(positions) < end:
+            seen = set(positions)
+            positions += [pos for pos in self._fuzzy_matches(query) if pos not in seen]
+
+        return [self.names[pos] for pos in positions[offset:end]]
+
+    # number of player names matching the query, every page of search
+    def count(self, query):
+        query = normalize(query)
+        if not query:
+            return len(self.names)
+        positions = set(self._prefix_matches(query))
+        return len(positions) + sum(pos not in positions for pos in self._fuzzy_matches(query))
+
+
+# function to draw a search box and a bounded select box of matching players,
+# returns the selected player name
+def player_select(label, name_index, key, search_label='Search players:'):
+    import streamlit as st
+
+    query = st.text_input(search_label, key=key + '_query', placeholder='Type a player name')
+    page = 0
+    if query:
+        # pages of the matches, keyed by the query so a new search starts on the first page
+        pages = max(1, -(-name_index.count(query) // PAGE_SIZE))
+        page = st.number_input('Results page', min_value=1, max_value=pages,
+                               key=key + '_page_' + query) - 1
+
+    candidates = name_index.search(query, offset=page * PAGE_SIZE)
+    if not candidates:
+        st.info('No players match "' + query + '".')
+        return None
+    return st.selectbox(label, candidates, key=key)
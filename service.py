@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:45:03 2026
+
+Similarity Service
+
+A small HTTP service answering the similarity questions of the pages as JSON.
+The stats, indexes and neighbor tables of every season and of all years are
+loaded once at startup and every request is answered from memory.
+
+    GET /similarity?player_1=<id or name>&player_2=<id or name>[&year=All Years]
+    GET /similar?player=<id or name>&year=<season>[&k=5]
+    GET /similar?player=<id or name>[&year=All Years][&k=5][&distinct=0]
+    GET /search?q=<text>[&year=All Years][&limit=20][&offset=0]
+    GET /stat_line?<stat>=<value>...[&year=All Years][&k=5][&base=<id or name>][&distinct=0]
+    GET /health
+
+@author: Josh Phelan
+"""
+
+
+import argparse
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+from urllib.parse import parse_qs, urlsplit
+from artifacts import load_metric_features, load_neighbors, load_stats
+from dataset import read_stats
+from neighbors import NeighborIndex, player_groups
+from pipeline import YEARS
+from search import NameIndex, PAGE_SIZE
+from stat_lines import StatLineQuery
+
+logger = logging.getLogger(__name__)
+
+# most similar players a request may ask for
+MAX_K = 50
+
+
+class ServiceError(Exception):
+    # error answered with an http status and a message
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Year:
+    # everything needed to answer queries about the players of a season or all years
+    def __init__(self, year):
+        self.year = year
+        self.stats = read_stats(year, columns=['Player'])
+        self.names = NameIndex(self.stats)
+        # distances in the space of the metric the year was built with
+        ids, features = load_metric_features(year)
+        # group each player's seasons so all years queries can return distinct players
+        groups = player_groups(ids) if year == 'All Years' else None
+        self.index = NeighborIndex(ids, features, groups=groups)
+        self.neighbors = None if year == 'All Years' else load_neighbors(year)
+        self.max_distance = load_stats(year).max_distance
+        self.stat_lines = StatLineQuery(year, self.index, self.max_distance)
+        # full stat lines of the players, the base of stat lines that change a few stats
+        self.lines = read_stats(year, columns=self.stat_lines.columns)
+
+    # function to return the player id for a player id or name, 404 when there is none
+    def player_id(self, player):
+        if player in self.index.ids:
+            return player
+        try:
+            return self.names.id(player)
+        except KeyError:
+            raise ServiceError(404, 'Unknown player in ' + self.year + ': ' + player)
+
+    # function to describe players with their distances and similarity scores
+    def players(self, player_ids, distances):
+        names = self.stats['Player'].reindex(player_ids)
+        return [{'id': player_id, 'name': name, 'distance': float(d),
+                 'similarity': float(1 - d/self.max_distance)}
+                for player_id, name, d in zip(player_ids, names, distances)]
+
+
+class SimilarityService:
+    # the loaded years and the queries the http handler answers
+    def __init__(self, years=None):
+        start = perf_counter()
+        self.years = {year: Year(year) for year in (years or YEARS + ['All Years'])}
+        logger.info('Loaded %d years in %.1f s', len(self.years), perf_counter() - start)
+
+    def year(self, year):
+        if year not in self.years:
+            raise ServiceError(404, 'Unknown year: ' + year)
+        return self.years[year]
+
+    # similarity score between two players, the score of the Compare Players page
+    def similarity(self, player_1, player_2, year='All Years'):
+        data = self.year(year)
+        id_1, id_2 = data.player_id(player_1), data.player_id(player_2)
+        d = data.index.distance(id_1, id_2)
+        return {'year': year, 'id_1': id_1, 'player_1': data.stats.at[id_1, 'Player'],
+                'id_2': id_2, 'player_2': data.stats.at[id_2, 'Player'],
+                'distance': d, 'similarity': 1 - d/data.max_distance}
+
+    # k most similar players to a player, from the precomputed neighbor table of a season or
+    # the KD-tree, and for all years only each other player's closest season by default
+    def similar(self, player, year='All Years', k=5, distinct=True):
+        if not 1 <= k <= MAX_K:
+            raise ServiceError(400, 'k must be between 1 and ' + f'{MAX_K}')
+        data = self.year(year)
+        player_id = data.player_id(player)
+        if year == 'All Years' and distinct:
+            ids, d = data.index.distinct_nearest(player_id, k)
+        elif data.neighbors is not None and k <= data.neighbors.k:
+            ids, d = data.neighbors.nearest(player_id, k)
+        else:
+            ids, d = data.index.nearest(player_id, k)
+        return {'year': year, 'id': player_id, 'similar': data.players(ids, d)}
+
+    # k most similar players to a stat line that need not be in the dataset, stats is a dict
+    # of stat values and the other stats are the base player's or the mean of the year
+    def stat_line(self, stats, year='All Years', k=5, base=None, distinct=True):
+        if not 1 <= k <= MAX_K:
+            raise ServiceError(400, 'k must be between 1 and ' + f'{MAX_K}')
+        data = self.year(year)
+        base_id = None if base is None else data.player_id(base)
+        base_line = None if base is None else data.lines.loc[base_id]
+        try:
+            # the base player is left out, an unchanged line would match it exactly
+            ids, d, s = data.stat_lines.nearest(stats, k, base_line, distinct, base_id)
+        except KeyError as e:
+            raise ServiceError(400, e.args[0])
+        return {'year': year, 'stats': stats, 'similar': data.players(ids, d)}
+
+    # player names matching a search, prefix matches first then misspellings
+    def search(self, query, year='All Years', limit=PAGE_SIZE, offset=0):
+        data = self.year(year)
+        names = data.names.search(query, limit=limit, offset=offset)
+        return {'year': year, 'players': [{'id': data.names.id(name), 'name': name}
+                                          for name in names]}
+
+
+# function to return a query parameter, 400 when a required one is missing
+def _param(params, name, default=None, type=str):
+    if name not in params:
+        if default is None:
+            raise ServiceError(400, 'Missing parameter: ' + name)
+        return default
+    try:
+        return type(params[name][0])
+    except ValueError:
+        raise ServiceError(400, 'Invalid parameter: ' + name)
+
+
+class Handler(BaseHTTPRequestHandler):
+    # answers GET requests with json, keeping connections open between requests
+    protocol_version = 'HTTP/1.1'
+    # the headers and body are written separately, with nagle each response on a kept
+    # alive connection waits ~40 ms for the client's delayed ack
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        service = self.server.service
+        try:
+            if url.path == '/similarity':
+                body = service.similarity(_param(params, 'player_1'), _param(params, 'player_2'),
+                                          _param(params, 'year', 'All Years'))
+            elif url.path == '/similar':
+                body = service.similar(_param(params, 'player'), _param(params, 'year', 'All Years'),
+                                       _param(params, 'k', 5, int),
+                                       _param(params, 'distinct', 1, int) != 0)
+            elif url.path == '/search':
+                body = service.search(_param(params, 'q', ''), _param(params, 'year', 'All Years'),
+                                      _param(params, 'limit', PAGE_SIZE, int),
+                                      _param(params, 'offset', 0, int))
+            elif url.path == '/stat_line':
+                options = ('year', 'k', 'base', 'distinct')
+                stats = {name: _param(params, name, type=float) for name in params if name not in options}
+                body = service.stat_line(stats, _param(params, 'year', 'All Years'),
+                                         _param(params, 'k', 5, int), params.get('base', [None])[0],
+                                         _param(params, 'distinct', 1, int) != 0)
+            elif url.path == '/health':
+                body = {'status': 'ok', 'years': list(service.years)}
+            else:
+                raise ServiceError(404, 'Unknown path: ' + url.path)
+            self._send(200, body)
+        except ServiceError as e:
+            self._send(e.status, {'error': e.message})
+        except Exception:
+            logger.exception('Failed to answer %s', self.path)
+            self._send(500, {'error': 'Internal error'})
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', f'{len(data)}')
+        self.end_headers()
+        self.wfile.write(data)
+
+    # requests are logged at debug level rather than printed, printing every request
+    # costs more than answering it
+    def log_message(self, format, *args):
+        logger.debug('%s ' + format, self.address_string(), *args)
+
+
+# function to create the http server for a service, serve_forever starts answering
+def make_server(service, host='127.0.0.1', port=8000):
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve similarity queries over http.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--years', nargs='*', help="years to load, defaults to every season and 'All Years'")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    server = make_server(SimilarityService(args.years), args.host, args.port)
+    logger.info('Serving on http://%s:%d', *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
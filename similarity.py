@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:43:48 2026
+
+Batch Similarity
+
+Scores many players at once from the standardized features of a year, without
+Streamlit. topk finds each player's most similar players and pairwise scores
+every pair of a query and a target player, both with the 1 - d/max_d similarity
+score the pages show. Results are computed in batches of players and streamed
+to csv, json lines or parquet, e.g. every 2022 player against all years:
+
+    python similarity.py topk --season 2022 -k 5 -o similar_2022.parquet
+
+@author: Josh Phelan
+"""
+
+
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+from artifacts import load_metric_features, load_stats
+from dataset import read_stats
+from distance import pairwise_distances, query_top_k
+from loader import temp_file
+from neighbors import PlayerGroups, distinct_top_k, player_groups
+
+# players scored per batch, each batch holds a batch_size x players distance block
+BATCH_SIZE = 1024
+
+# output format of each file extension
+FORMATS = {'.csv': 'csv', '.json': 'json', '.jsonl': 'json', '.parquet': 'parquet'}
+
+
+class Scorer:
+    # similarity scores between the players of a year, from the features in the space of
+    # the metric the year was built with and the max distance precomputed by the pipeline
+    def __init__(self, year='All Years'):
+        self.year = year
+        self.ids, self.features = load_metric_features(year)
+        self.max_distance = load_stats(year).max_distance
+        self.names = read_stats(year, columns=['Player'])['Player'].reindex(self.ids)
+        self.groups = PlayerGroups(player_groups(self.ids)) if year == 'All Years' else None
+        self._by_name = {}
+        for player_id, name in zip(self.ids, self.names):
+            self._by_name.setdefault(name, player_id)
+
+    # function to return the similarity score of distances, the same as the pages
+    def similarity(self, d):
+        return 1 - d/self.max_distance
+
+    # function to map player ids or names to the ids of this year, for all years a season
+    # picks the season of bare basketball reference ids and names, e.g. 'jamesle01'
+    # returns the ids found and the players that were not
+    def resolve(self, players, season=None):
+        found, missing = [], []
+        suffix_id = f'{season}' if season is not None and self.year == 'All Years' else ''
+        suffix_name = ' (' + suffix_id + ')' if suffix_id else ''
+        for player in players:
+            for candidate in (player, player + suffix_id):
+                if candidate in self.ids:
+                    found.append(candidate)
+                    break
+            else:
+                player_id = self._by_name.get(player, self._by_name.get(player + suffix_name))
+                if player_id is None:
+                    missing.append(player)
+                else:
+                    found.append(player_id)
+        return found, missing
+
+    # function to yield frames of the k most similar players to each player, a batch of
+    # players at a time. For all years only each player's most similar season is kept and
+    # the player's own other seasons are left out, like the Compare All Years page
+    def top_k(self, player_ids, k=5, distinct=True, batch_size=BATCH_SIZE):
+        positions = self.ids.get_indexer(player_ids)
+        distinct = distinct and self.groups is not None
+        for start in range(0, len(positions), batch_size):
+            batch = positions[start:start + batch_size]
+            if distinct:
+                d = pairwise_distances(self.features[batch], self.features)
+                found = [distinct_top_k(row, self.groups, self.groups.codes[j], k)
+                         for row, j in zip(d, batch)]
+                indices = np.array([idx for idx, dist in found])
+                neighbor_d = np.array([dist for idx, dist in found])
+            else:
+                indices, neighbor_d = query_top_k(self.features[batch], self.features, k, batch)
+
+            queries = np.repeat(batch, indices.shape[1])
+            matches = indices.ravel()
+            yield pd.DataFrame({
+                'ID': self.ids[queries], 'Player': self.names.values[queries],
+                'Rank': np.tile(np.arange(1, indices.shape[1] + 1), len(batch)),
+                'Similar ID': self.ids[matches], 'Similar Player': self.names.values[matches],
+                'Distance': neighbor_d.ravel(), 'Similarity': self.similarity(neighbor_d.ravel())})
+
+    # function to yield frames of the similarity of every query player to every target
+    # player, a batch of query players at a time
+    def pairwise(self, player_ids, target_ids, batch_size=BATCH_SIZE):
+        positions = self.ids.get_indexer(player_ids)
+        targets = self.ids.get_indexer(target_ids)
+        for start in range(0, len(positions), batch_size):
+            batch = positions[start:start + batch_size]
+            d = pairwise_distances(self.features[batch], self.features[targets])
+            # the same player is exactly 0 apart, which rounding in the matrix product can miss
+            d[batch[:, None] == targets[None, :]] = 0
+
+            queries = np.repeat(batch, len(targets))
+            matches = np.tile(targets, len(batch))
+            yield pd.DataFrame({
+                'ID 1': self.ids[queries], 'Player 1': self.names.values[queries],
+                'ID 2': self.ids[matches], 'Player 2': self.names.values[matches],
+                'Distance': d.ravel(), 'Similarity': self.similarity(d.ravel())})
+
+
+class ResultWriter:
+    # streams frames of results to one csv, json lines or parquet file, or csv and json to
+    # stdout for '-'. Files are written to a temp file and renamed when the writer closes,
+    # so a failed run never leaves a partial file behind
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.format = fmt or FORMATS.get(os.path.splitext(path)[1].lower(), 'csv')
+        if path == '-' and self.format == 'parquet':
+            raise ValueError('parquet results need an output file')
+        self.rows = 0
+        self._parquet = None
+        if path == '-':
+            self._tmp = None
+            self._file = sys.stdout
+        else:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            fd, self._tmp = temp_file(path, prefix='.')
+            if self.format == 'parquet':
+                self._file = os.fdopen(fd, 'wb')
+            else:
+                self._file = os.fdopen(fd, 'w', encoding='utf-8', newline='')
+
+    def write(self, frame):
+        if self.format == 'csv':
+            frame.to_csv(self._file, header=self.rows == 0, index=False)
+        elif self.format == 'json':
+            lines = frame.to_json(orient='records', lines=True)
+            self._file.write(lines if lines.endswith('\n') else lines + '\n')
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self._file, table.schema)
+            self._parquet.write_table(table)
+        self.rows += len(frame)
+
+    def close(self, keep=True):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._tmp is None:
+            self._file.flush()
+            return
+        self._file.close()
+        if keep:
+            os.replace(self._tmp, self.path)
+        else:
+            os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(keep=exc_type is None)
+
+
+# function to read player ids or names from a file with one player per line, '-' for stdin
+def read_players(path):
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        return [line.strip() for line in f if line.strip()]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+# function to return the players given on the command line, in the input file, and every
+# player of the season when --season is given without other players
+def query_players(args):
+    players = list(args.players)
+    if args.input:
+        players += read_players(args.input)
+    if not players and args.season is not None:
+        players = list(read_stats(args.season, columns=['Player']).index)
+    return players
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score the similarity of many players at once.')
+    parser.add_argument('mode', choices=['topk', 'pairwise'],
+                        help="each player's most similar players, or every query and target pair")
+    parser.add_argument('players', nargs='*', help='player ids or names to score')
+    parser.add_argument('-i', '--input', help='file of player ids or names, one per line, - for stdin')
+    parser.add_argument('--season', help='season of bare ids and names for all years, and the '
+                                         'players scored when none are given')
+    parser.add_argument('--year', default='All Years',
+                        help="year whose players are compared, 'All Years' by default")
+    parser.add_argument('-k', type=int, default=5, help='most similar players per player')
+    parser.add_argument('--all-seasons', action='store_true',
+                        help="for all years keep every season rather than each player's closest")
+    parser.add_argument('--targets', help='file of target players for pairwise, defaults to the players')
+    parser.add_argument('-o', '--output', default='-', help='csv, json (json lines) or parquet '
+                                                            'file by extension, - for csv on stdout')
+    parser.add_argument('--format', choices=['csv', 'json', 'parquet'], help='override the output format')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='players scored per batch')
+    args = parser.parse_args()
+
+    scorer = Scorer(args.year)
+    player_ids, missing = scorer.resolve(query_players(args), args.season)
+    target_ids = player_ids
+    if args.mode == 'pairwise' and args.targets:
+        target_ids, missing_targets = scorer.resolve(read_players(args.targets), args.season)
+        missing += missing_targets
+    for player in missing:
+        print('Unknown player:', player, file=sys.stderr)
+    if not player_ids:
+        parser.error('no players to score')
+
+    if args.mode == 'topk':
+        frames = scorer.top_k(player_ids, args.k, not args.all_seasons, args.batch_size)
+    else:
+        frames = scorer.pairwise(player_ids, target_ids, args.batch_size)
+
+    with ResultWriter(args.output, args.format) as writer:
+        for frame in frames:
+            writer.write(frame)
+    print('Wrote', writer.rows, 'rows for', len(player_ids), 'players to', args.output, file=sys.stderr)
+    if missing:
+        raise SystemExit(1)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:59:12 2026
+
+Stat Line Queries
+
+Similarity of stat lines that are not in a dataset, such as a player's current
+season or a hypothetical "25 PPG, 10 RPG, 55% TS" line, to the players of any
+season or of all years, with no rebuild. A line is standardized with the scaler
+saved with the year's artifacts, projected and transformed by the metric like
+the stored features, and looked up in the year's KD-tree. A line that does not
+start from a player is only compared on the stats it sets, since the year's
+mean of every other stat would otherwise decide most of the distance.
+
+@author: Josh Phelan
+"""
+
+
+import numpy as np
+from artifacts import (ARTIFACT_DIR, load_features, load_scaler, load_projection, load_metric,
+                       load_metric_features, load_stats)
+from neighbors import NeighborIndex, player_groups
+from weighted import SPACES, WeightedSpace, weight_key
+
+
+class StatLineQuery:
+    # the scaler, projection and metric of a year's artifacts with the year's index, index and
+    # max_distance are loaded when not given, e.g. by callers that already hold them
+    # spaces returns the weighted space of a dict of stat weights, see weighted.py, and
+    # defaults to spaces built from the artifacts and kept in the shared cache of spaces
+    def __init__(self, year, index=None, max_distance=None, spaces=None, artifact_dir=ARTIFACT_DIR):
+        self.year = year
+        self.artifact_dir = artifact_dir
+        self.spaces = self._space if spaces is None else spaces
+        self.columns, self.mean, self.scale = load_scaler(year, artifact_dir)
+        self.projection = load_projection(year, artifact_dir)
+        self.metric, self.fitted = load_metric(year, artifact_dir)
+        if index is None:
+            ids, x = load_metric_features(year, artifact_dir)
+            # group each player's seasons so all years queries can return distinct players
+            groups = player_groups(ids) if year == 'All Years' else None
+            index = NeighborIndex(ids, x, groups=groups)
+        self.index = index
+        if max_distance is None:
+            max_distance = load_stats(year, artifact_dir).max_distance
+        self.max_distance = max_distance
+
+    # function to return a full stat line in the order of the feature columns from a dict of
+    # stat values, the stats not given are taken from base, e.g. an existing player's stats,
+    # or are the mean of the year's players. Raises a KeyError for stats that are not features
+    def line(self, stats, base=None):
+        unknown = [name for name in stats if name not in self.columns]
+        if unknown:
+            raise KeyError('Unknown stats: ' + ', '.join(unknown))
+        if base is None:
+            values = self.mean.copy()
+        else:
+            values = np.array([base[name] for name in self.columns], dtype=np.float64)
+        for name, value in stats.items():
+            values[self.columns.index(name)] = value
+        return values
+
+    # function to return the weighted space of stat weights built from the year's features
+    def _space(self, weights):
+        key = weight_key(self.columns, weights)
+
+        def build():
+            ids, features = load_features(self.year, self.artifact_dir)
+            groups = player_groups(ids) if self.year == 'All Years' else None
+            return WeightedSpace(ids, features, self.columns, key, groups, self.metric)
+        return SPACES.get(('stat lines', self.artifact_dir, self.year, key), build)
+
+    # function to return a full stat line as a point in the space of the year's index
+    def point(self, line):
+        x = (np.asarray(line, dtype=np.float64) - self.mean) / self.scale
+        if self.projection is not None:
+            x = x @ self.projection
+        return self.metric.transform(x[None, :], self.fitted)[0]
+
+    # function to return the ids, distances and similarity scores of the k players most similar
+    # to a stat line given like line, for all years only each player's closest season unless
+    # distinct is False. Scores are 1 - d/max_d like those of the players in the dataset
+    # exclude is a player id left out of the results, e.g. the base player a line was edited
+    # from, for all years every season of the player is left out
+    # without a base the line is only compared on the stats given, with equal weights, and
+    # the scores are relative to the max distance of the players on those stats
+    def nearest(self, stats, k=5, base=None, distinct=True, exclude=None):
+        line = self.line(stats, base)
+        if base is None and stats:
+            space = self.spaces({name: 1.0 for name in stats})
+            point = space.point((line - self.mean) / self.scale)
+            if distinct and self.year == 'All Years':
+                ids, d = space.distinct_query(point, k)
+            else:
+                ids, d = space.query(point, k)
+            return ids, d, space.similarity(d)
+
+        point = self.point(line)
+        all_years = self.year == 'All Years'
+        players = self.index.ids.str[:-4] if all_years else self.index.ids
+        excluded = exclude[:-4] if all_years and exclude is not None else exclude
+        # rows of the excluded player, asked for on top of k and dropped
+        extra = int(np.count_nonzero(players == excluded)) if exclude is not None else 0
+        if distinct and all_years:
+            ids, d = self.index.distinct_query(point, k + min(extra, 1))
+        else:
+            ids, d = self.index.query(point, k + extra)
+        if extra:
+            keep = (ids.str[:-4] if all_years else ids) != excluded
+            ids, d = ids[keep][:k], d[keep][:k]
+        return ids, d, 1 - d/self.max_distance
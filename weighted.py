@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:47:02 2026
+
+Weighted Stat Subset Similarity
+
+Similarity on a chosen subset of the stats with optional per stat weights,
+computed on the fly from the stored standardized features, so "similar as a
+scorer" or "similar defensively" needs no pipeline run. Each subset and
+weighting becomes a weighted feature matrix with its own max and mean distance,
+kept in a bounded least recently used cache.
+
+@author: Josh Phelan
+"""
+
+
+import threading
+from collections import OrderedDict
+import numpy as np
+from distance import max_mean_distance, query_top_k
+from metrics import get_metric
+from neighbors import PlayerGroups, distinct_top_k
+
+# stats compared by each preset of the similarity controls
+PRESETS = {
+    'Scoring': ['PTS', 'FG', 'FGA', 'FG%', '3P', '3PA', '3P%', '2P', '2PA', '2P%', 'eFG%',
+                'FT', 'FTA', 'FT%', 'TS%', '3PAr', 'FTr', 'USG%', 'OWS', 'OBPM'],
+    'Defense': ['DRB', 'STL', 'BLK', 'PF', 'DRB%', 'STL%', 'BLK%', 'DWS', 'DBPM'],
+    'Playmaking': ['AST', 'TOV', 'AST%', 'TOV%', 'USG%'],
+    'Rebounding': ['ORB', 'DRB', 'TRB', 'ORB%', 'DRB%', 'TRB%'],
+}
+
+# function to return the canonical form of a dict of stat weights, the stats with a
+# positive weight in feature order with the weights scaled so the largest is 1
+# scaling every weight alike does not change any similarity score, so equal keys
+# always mean equal scores, returns an empty tuple when no stat has a positive weight
+def weight_key(names, weights):
+    chosen = [(name, float(weights[name])) for name in names if weights.get(name, 0) > 0]
+    if not chosen:
+        return ()
+    top = max(weight for name, weight in chosen)
+    return tuple((name, round(weight / top, 6)) for name, weight in chosen)
+
+
+class WeightedSpace:
+    # the players of a year compared on a subset of the standardized stats, each column
+    # multiplied by the square root of its weight so plain euclidean distances in the
+    # space are the weighted distances. key is a weight_key of the feature names
+    # the metric is fitted to the weighted subset, Mahalanobis whitening undoes any
+    # weighting so under it only the choice of stats matters
+    def __init__(self, ids, features, names, key, groups=None, metric=None):
+        self.ids = ids
+        self.key = key
+        self.positions = [names.index(name) for name, weight in key]
+        self.scale = np.sqrt([weight for name, weight in key])
+        x = np.asarray(features, dtype=np.float64)[:, self.positions] * self.scale
+        self.metric = get_metric('euclidean') if metric is None else metric
+        self.fitted = self.metric.fit(x)
+        self.x = np.ascontiguousarray(self.metric.transform(x, self.fitted))
+        self.groups = None if groups is None else PlayerGroups(groups)
+        self.max_distance, self.mean_distance = max_mean_distance(self.x)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # bytes held by the space, what the cache bounds
+    @property
+    def nbytes(self):
+        return self.x.nbytes
+
+    # row position of a player id
+    def position(self, player_id):
+        return self.ids.get_loc(player_id)
+
+    # distances from a player to every player in one vectorized pass, 0 to itself
+    def row(self, player_id):
+        diff = self.x - self.x[self.position(player_id)]
+        return np.sqrt(np.einsum('ij,ij->i', diff, diff))
+
+    # similarity scores of distances, 1 - d/max_d like the precomputed similarity
+    def similarity(self, d):
+        return 1 - d/self.max_distance
+
+    # distance between two players
+    def distance(self, player_1, player_2):
+        diff = self.x[self.position(player_1)] - self.x[self.position(player_2)]
+        return float(np.sqrt(diff @ diff))
+
+    # distances from a player to each of the given player ids
+    def distances_to(self, player_id, other_ids):
+        diff = self.x[self.ids.get_indexer(other_ids)] - self.x[self.position(player_id)]
+        return np.sqrt(np.einsum('ij,ij->i', diff, diff))
+
+    # ids and distances of the k nearest players to a player, closest first
+    def nearest(self, player_id, k=5):
+        j = self.position(player_id)
+        indices, d = query_top_k(self.x[[j]], self.x, k, [j])
+        return self.ids[indices[0]], d[0]
+
+    # ids and distances of the k nearest distinct players to a player, using each
+    # player's closest season and leaving out the player's own other seasons
+    def distinct_nearest(self, player_id, k=5):
+        j = self.position(player_id)
+        positions, d = distinct_top_k(self.row(player_id), self.groups, self.groups.codes[j], k)
+        return self.ids[positions], d
+
+    # function to return a standardized stat line of every feature, e.g. one that is not
+    # in the dataset, as a point in the space
+    def point(self, scaled):
+        x = np.asarray(scaled, dtype=np.float64)[self.positions] * self.scale
+        return self.metric.transform(x[None, :], self.fitted)[0]
+
+    # ids and distances of the k nearest players to a point in the space, closest first
+    def query(self, point, k=5):
+        diff = self.x - point
+        d = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+        k = min(k, len(d))
+        indices = np.lexsort((np.arange(len(d)), d))[:k]
+        return self.ids[indices], d[indices]
+
+    # ids and distances of the k nearest distinct players to a point in the space, using
+    # each player's closest season
+    def distinct_query(self, point, k=5):
+        diff = self.x - point
+        positions, d = distinct_top_k(np.sqrt(np.einsum('ij,ij->i', diff, diff)), self.groups, None, k)
+        return self.ids[positions], d
+
+    # fraction of a player's comparisons that are closer than the given distance
+    def percentile(self, player_id, distance):
+        row = self.row(player_id)
+        row[self.position(player_id)] = np.inf
+        return float(np.count_nonzero(row < distance) / (len(row) - 1))
+
+
+class SpaceCache:
+    # least recently used weighted spaces by key, e.g. (dataset, feature set and weights),
+    # holding at most max_entries spaces and max_bytes of weighted feature matrices
+    def __init__(self, max_entries=32, max_bytes=256 * 2 ** 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._spaces = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._spaces)
+
+    # bytes held by the cached spaces
+    @property
+    def nbytes(self):
+        return sum(space.nbytes for space in self._spaces.values())
+
+    # function to return the space of a key, calling build to make it on a miss and
+    # evicting the least recently used spaces beyond the limits
+    def get(self, key, build):
+        with self._lock:
+            if key in self._spaces:
+                self._spaces.move_to_end(key)
+                self.hits += 1
+                return self._spaces[key]
+
+        # built outside the lock so other keys are not held up, two sessions asking for
+        # the same new key at once both build it and the second replaces the first
+        space = build()
+        with self._lock:
+            self.misses += 1
+            self._spaces[key] = space
+            while len(self._spaces) > 1 and (len(self._spaces) > self.max_entries
+                                             or self.nbytes > self.max_bytes):
+                self._spaces.popitem(last=False)
+        return space
+
+    def clear(self):
+        with self._lock:
+            self._spaces.clear()
+
+
+# weighted spaces shared by every caller in the process
+SPACES = SpaceCache()
+
+# function to draw the similarity controls of a page, a preset or custom subset of the
+# stats and optional weights, returns the chosen stat weights or None for all stats
+def similarity_controls(names, key='similarity'):
+    import streamlit as st
+
+    with st.expander('Customize similarity'):
+        preset = st.selectbox('Compare players on:', ['All stats'] + list(PRESETS) + ['Custom'],
+                              key=key + '_preset')
+        if preset == 'All stats':
+            return None
+
+        default = [name for name in PRESETS.get(preset, []) if name in names]
+        # each preset keeps its own selection so switching presets shows its stats
+        chosen = st.multiselect('Stats:', names, default, key=key + '_stats_' + preset)
+        if not chosen:
+            st.info('Choose at least one stat, all stats are compared until then.')
+            return None
+
+        weights = {name: 1.0 for name in chosen}
+        if st.checkbox('Weight stats', key=key + '_weighted'):
+            for name in chosen:
+                weights[name] = st.slider(name, 0.0, 5.0, 1.0, 0.25, key=key + '_weight_' + name)
+    return weights if weight_key(names, weights) else None